@@ -0,0 +1,9 @@
+"""
+pcwbot benchmarks
+
+Run a benchmark from the top level directory of pcwbot, e.g.:
+python -m benchmarks.tail_latency
+
+or the whole suite with JSON results:
+python -m benchmarks.suite --json results.json
+"""
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure admin lookups by GUID and the head admin count on a database
+with the former unindexed schema and again after migrate_database.
+
+Usage: python -m benchmarks.admin_lookup [<rows>] [<lookups>]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+
+import pcwbot
+
+
+def fill_database(connection, rows, seed=1):
+    """
+    create the schema of the first pcwbot versions and insert rows, every 50th GUID twice
+    """
+    rnd = random.Random(seed)
+    connection.execute('CREATE TABLE admins (id INTEGER PRIMARY KEY NOT NULL, guid TEXT NOT NULL, name TEXT NOT NULL, ip_address TEXT NOT NULL, admin_role INTEGER DEFAULT 1)')
+    values = [('%032X' % (num - num % 50 if num % 50 == 1 else num), 'Player%d' % num, '10.%d.%d.%d' % (num >> 16, (num >> 8) & 255, num & 255),
+               rnd.choice((1, 1, 1, 20, 40, 80))) for num in xrange(rows)]
+    connection.executemany("INSERT INTO `admins` (`guid`,`name`,`ip_address`,`admin_role`) VALUES (?,?,?,?)", values)
+    connection.commit()
+
+
+def measure(connection, guids):
+    """
+    return the average GUID lookup and head admin count time in microseconds
+    """
+    cursor = connection.cursor()
+    start = time.time()
+    for guid in guids:
+        cursor.execute("SELECT `admin_role` FROM `admins` WHERE `guid` = ?", (guid,))
+        cursor.fetchone()
+    lookup = 1000000 * (time.time() - start) / len(guids)
+    start = time.time()
+    for _ in xrange(20):
+        cursor.execute("SELECT COUNT(*) FROM `admins` WHERE `admin_role` = 100")
+        cursor.fetchone()
+    count = 1000000 * (time.time() - start) / 20
+    return lookup, count
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    handle, path = tempfile.mkstemp(prefix='pcwbot-bench-', suffix='.sqlite')
+    os.close(handle)
+    try:
+        connection = sqlite3.connect(path)
+        fill_database(connection, rows)
+        rnd = random.Random(2)
+        guids = ['%032X' % rnd.randrange(rows * 2) for _ in xrange(lookups)]
+
+        print "rows=%d lookups=%d" % (rows, lookups)
+        print "%-10s per lookup=%.1fus head admin count=%.1fus" % (('before',) + measure(connection, guids))
+        start = time.time()
+        applied = pcwbot.migrate_database(connection)
+        print "migrated to version %d in %.2fms, rows left=%d" % (applied[-1][0], 1000 * (time.time() - start), connection.execute("SELECT COUNT(*) FROM admins").fetchone()[0])
+        print "%-10s per lookup=%.1fus head admin count=%.1fus" % (('after',) + measure(connection, guids))
+        connection.close()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local UDP stand-in for an Urban Terror server which answers the getstatus
+and rcon packets of PyQuake3.
+"""
+
+import time
+import random
+import socket
+
+from threading import Thread
+
+
+class FakeQuake3Server(Thread):
+    """
+    fake Quake 3 server running in a daemon thread
+    """
+    prefix = '\xff' * 4
+
+    def __init__(self, rcon_password='secret', loss=0.0, delay=0.0, maps=None, players=None, seed=1):
+        """
+        create and start a fake server on a random local port
+
+        @param loss: The probability a request packet is dropped
+        @param delay: The seconds to wait before answering
+        @param maps: The map names returned for 'dir map bsp'
+        @param players: The (num, name, score, ping) tuples of the connected players, the ping may be 'CNCT' or 'ZMBI'
+        """
+        Thread.__init__(self)
+        self.setDaemon(True)
+        self.rcon_password = rcon_password
+        self.loss = loss
+        self.delay = delay
+        self.maps = maps if maps is not None else ['ut4_abbey', 'ut4_casa', 'ut4_turnpike', 'ut4_uptown']
+        self.players = players if players is not None else [(num, 'Player%02d' % num, num, 50 + num) for num in xrange(8)]
+        self.random = random.Random(seed)
+        self.commands = []
+        # receive time of every entry of commands
+        self.command_times = []
+        self.received = 0
+        self.dropped = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self.start()
+
+    def get_address(self):
+        return '127.0.0.1:%d' % self.port
+
+    def send(self, addr, response_type, data):
+        self.sock.sendto('%s%s\n%s' % (self.prefix, response_type, data), addr)
+
+    def status_text(self):
+        lines = ['map: ut4_casa', 'num score ping name            lastmsg address               qport rate',
+                 '--- ----- ---- --------------- ------- --------------------- ----- -----']
+        for num, name, score, ping in self.players:
+            lines.append('%3d %5d %4s %-15s %7d %-21s %5d %5d' % (num, score, ping, name, 0, '10.0.0.%d:27960' % num, 1000 + num, 25000))
+        return '\n'.join(lines) + '\n'
+
+    def dumpuser_text(self, num):
+        for player in self.players:
+            if str(player[0]) == num:
+                return 'userinfo\n--------\nip              10.0.0.%d:27960\nname            %s\ncl_guid         %032X\n' % (player[0], player[1], 0xABCDEF0000 + player[0])
+        return 'Player %s is not on the server\n' % num
+
+    def getstatus_text(self):
+        players = ''.join(['%d %d "%s"\n' % (score, ping if isinstance(ping, int) else 999, name) for _, name, score, ping in self.players])
+        return '\\sv_hostname\\Fake Server\\mapname\\ut4_casa\\g_gametype\\7\\sv_maxclients\\20\n%s' % players
+
+    def handle(self, data, addr):
+        data = data[len(self.prefix):].rstrip('\n')
+        if data == 'getstatus':
+            self.send(addr, 'statusResponse', self.getstatus_text())
+            return
+        if not data.startswith('rcon '):
+            return
+        try:
+            _, password, command = data.split(' ', 2)
+        except ValueError:
+            return
+        if password.strip('"') != self.rcon_password:
+            self.send(addr, 'print', 'Bad rconpassword.\n')
+            return
+        self.commands.append(command)
+        self.command_times.append(time.time())
+        if command == 'status':
+            self.send(addr, 'print', self.status_text())
+        elif command.startswith('dumpuser '):
+            self.send(addr, 'print', self.dumpuser_text(command[9:]))
+        elif command == 'dir map bsp':
+            text = ''.join(['/%s.bsp\n' % name for name in self.maps])
+            # split long listings like the server does
+            for pos in xrange(0, len(text), 1000):
+                self.send(addr, 'print', text[pos:pos + 1000])
+        else:
+            self.send(addr, 'print', '')
+
+    def run(self):
+        while 1:
+            data, addr = self.sock.recvfrom(8192)
+            self.received += 1
+            if self.loss and self.random.random() < self.loss:
+                self.dropped += 1
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            self.handle(data, addr)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Replay a synthetic multi-megabyte games.log through LogParser and report the
+throughput in lines/sec: line by line, with the chunked reader and with the
+memory-mapped offline replay.
+
+Usage: python -m benchmarks.log_throughput [<megabytes>]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from benchmarks import synthlog
+
+
+def replay_readline(parser, path):
+    """
+    the former read_log loop: one readline() and one lock acquisition per line
+    """
+    count = 0
+    with open(path, 'r') as log_file:
+        for line in iter(log_file.readline, ''):
+            with parser.players_lock:
+                parser.parse_line(line)
+            count += 1
+    return count
+
+
+def replay_chunked(parser, path):
+    """
+    the read_log loop: chunked reads and one lock acquisition per batch
+    """
+    count = 0
+    parser.log_tail.open_log()
+    while 1:
+        lines = parser.log_tail.read_lines()
+        if not lines:
+            return count
+        parser.parse_lines(lines)
+        count += len(lines)
+
+
+def replay_mmap(parser, path):
+    """
+    the offline replay: matching the handled actions on a memory map
+    """
+    return parser.replay(path)[0]
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    directory = tempfile.mkdtemp(prefix='pcwbot-bench-')
+    try:
+        path = os.path.join(directory, 'games.log')
+        total = synthlog.write_log(path, int(megabytes * 1024 * 1024))
+        print "replaying %d lines (%.1f MB)" % (total, os.path.getsize(path) / 1048576.0)
+        synthlog.setup_database()
+        for name, replay in (('readline', replay_readline), ('chunked', replay_chunked), ('mmap', replay_mmap)):
+            parser = synthlog.create_parser(path, tail_backend='poll')
+            start = time.time()
+            count = replay(parser, path)
+            elapsed = time.time() - start
+            print "%-9s lines=%d time=%.3fs lines/sec=%d" % (name, count, elapsed, count / elapsed)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the former linear map search with MapCatalog on a catalog of
+synthetic map names.
+
+Usage: python -m benchmarks.map_lookup [<maps>] [<rounds>]
+"""
+
+import sys
+import time
+import random
+
+import pcwbot
+
+WORDS = ['abbey', 'algiers', 'austria', 'casa', 'docks', 'turnpike', 'uptown', 'kingdom', 'tohunga', 'prague',
+         'orbital', 'ramelle', 'riyadh', 'suburbs', 'swim', 'thingley', 'toxic', 'tunis', 'mandolin', 'sanc']
+SUFFIXES = ['', '_v2', '_b3', '_beta', '_final', '_ctf', '_night', '_snow', '_fixed', '_rc1']
+
+
+def map_names(count, seed=1):
+    """
+    return a list of unique synthetic map names
+    """
+    rnd = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add('ut4_%s%s%s' % (rnd.choice(WORDS), rnd.choice(['', '_', '2']) + rnd.choice(WORDS) if rnd.random() < .7 else '', rnd.choice(SUFFIXES)))
+    return sorted(names)
+
+
+def linear_find(all_maps, map_name):
+    """
+    the former LogParser.map_found search
+    """
+    map_list = []
+    append = map_list.append
+    for maps in all_maps:
+        if map_name.lower() == maps or ('ut4_%s' % map_name.lower()) == maps:
+            append(maps)
+            break
+        elif map_name.lower() in maps:
+            append(maps)
+    return map_list
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    names = map_names(count)
+    rnd = random.Random(2)
+    queries = [rnd.choice(names)[4:] for _ in xrange(rounds // 2)] + [rnd.choice(WORDS)[:3] for _ in xrange(rounds // 4)] + ['snow_f', 'xyz'] * (rounds // 8)
+
+    start = time.time()
+    catalog = pcwbot.MapCatalog(names)
+    print "maps=%d catalog build=%.2fms" % (len(catalog), 1000 * (time.time() - start))
+    for name, find in (('linear', lambda query: linear_find(names, query)), ('catalog', catalog.find)):
+        start = time.time()
+        for query in queries:
+            find(query)
+        elapsed = time.time() - start
+        print "%-8s queries=%d per query=%.1fus" % (name, len(queries), 1000000 * elapsed / len(queries))
+
+
+if __name__ == '__main__':
+    main()
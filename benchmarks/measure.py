@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measurement helpers shared by the benchmarks.
+"""
+
+import os
+import sys
+import json
+import time
+
+import pcwbot
+
+
+def rss_kb():
+    """
+    return the resident set size of this process in kB
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def cpu_seconds():
+    """
+    return the user and system CPU time of this process
+    """
+    times = os.times()
+    return times[0] + times[1]
+
+
+def percentile(values, pct):
+    """
+    return the given percentile of a list of values
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def summarize(latencies):
+    """
+    return count, mean, p50, p99 and max of a list of latencies in milliseconds
+    """
+    if not latencies:
+        return {'count': 0}
+    return {'count': len(latencies), 'mean_ms': 1000 * sum(latencies) / len(latencies), 'p50_ms': 1000 * percentile(latencies, 50),
+            'p99_ms': 1000 * percentile(latencies, 99), 'max_ms': 1000 * max(latencies)}
+
+
+def write_results(path, results):
+    """
+    write the results with the environment as JSON, '-' writes to stdout
+    """
+    document = {'pcwbot': pcwbot.__version__, 'python': sys.version.split()[0], 'platform': sys.platform,
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}
+    if path == '-':
+        json.dump(document, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+        return
+    with open(path, 'w') as result_file:
+        json.dump(document, result_file, indent=2, sort_keys=True)
+        result_file.write('\n')
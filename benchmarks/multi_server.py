@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the memory and CPU cost per managed game server when one bot process
+handles several servers on a shared event loop. Each run starts a fresh
+interpreter with N fake servers and N games logs receiving synthetic traffic.
+
+Usage: python -m benchmarks.multi_server [<servers,...>] [<lines/sec per server>] [<seconds>]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import pcwbot
+
+from benchmarks import synthlog
+from benchmarks.fakeserver import FakeQuake3Server
+from benchmarks.measure import rss_kb, cpu_seconds
+from benchmarks.traffic import TrafficGenerator
+
+
+def run(servers, rate, duration):
+    """
+    run the bot with the given number of servers, print 'rss_kb cpu_seconds'
+    """
+    directory = tempfile.mkdtemp(prefix='pcwbot-bench-')
+    try:
+        os.chdir(directory)
+        synthlog.setup_database(os.path.join(directory, 'data.sqlite'))
+        base_rss = rss_kb()
+        config = os.path.join(directory, 'settings.conf')
+        paths = []
+        with open(config, 'w') as config_file:
+            config_file.write('[bot]\nevent_loop = 1\nmap_refresh = 0\n')
+            for num in xrange(servers):
+                fake = FakeQuake3Server()
+                path = os.path.join(directory, 'games%d.log' % num)
+                open(path, 'w').close()
+                paths.append(path)
+                config_file.write('\n[server:%d]\nserver_ip = 127.0.0.1\nserver_port = %d\nrcon_password = secret\nlog_file = %s\n' % (num, fake.port, path))
+        loop = pcwbot.EventLoop()
+        for num in xrange(servers):
+            pcwbot.LogParser(config, 'server:%d' % num).start(loop)
+        feeders = [TrafficGenerator(log_path, rate, 0, 0, duration, seed=num) for num, log_path in enumerate(paths)]
+        for feeder in feeders:
+            feeder.start()
+        loop.call_later(duration, loop.stop)
+        start = cpu_seconds()
+        loop.run_forever()
+        for feeder in feeders:
+            feeder.join()
+        sys.stderr.write('%d %.3f\n' % (rss_kb() - base_rss, cpu_seconds() - start))
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(int(sys.argv[2]), float(sys.argv[3]), float(sys.argv[4]))
+        return
+    counts = [int(num) for num in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1, 4, 12]
+    rate = sys.argv[2] if len(sys.argv) > 2 else '50'
+    duration = sys.argv[3] if len(sys.argv) > 3 else '5'
+    for count in counts:
+        proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.multi_server', '--run', str(count), rate, duration],
+                                stdout=open(os.devnull, 'w'), stderr=subprocess.PIPE, cwd=os.getcwd())
+        result = proc.communicate()[1].strip().split('\n')[-1].split()
+        rss, cpu = int(result[0]), float(result[1])
+        print "servers=%-3d rss=%dkB (%.0fkB/server) cpu=%.3fs (%.1f%% of one core per server)" % (
+            count, rss, rss / float(count), cpu, 100 * cpu / float(duration) / count)
+
+
+if __name__ == '__main__':
+    main()
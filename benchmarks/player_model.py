@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare memory per player and construction cost of the former dict
+based Player with the __slots__ model.
+
+Usage: python -m benchmarks.player_model [<players>]
+"""
+
+import sys
+import time
+
+import pcwbot
+from benchmarks import synthlog
+
+
+class DictPlayer(object):
+    """
+    the former Player model
+    """
+    def __init__(self, player_num, ip_address, guid, name):
+        self.player_num = player_num
+        self.guid = guid
+        self.name = name.replace(' ', '')
+        self.prettyname = self.name
+        for item in xrange(10):
+            self.prettyname = self.prettyname.replace('^%d' % item, '')
+        self.registered_user = False
+        self.admin_role = 0
+        self.address = ip_address
+        self.team = 3
+
+
+def object_size(obj):
+    """
+    return the size of the object itself and of its attribute dictionary
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    args = [(num % 64, '10.0.%d.%d' % (num // 256 % 256, num % 256), '%032X' % num, synthlog.player_name(num)) for num in xrange(count)]
+
+    print "players=%d" % count
+    for name, model in (('dict', DictPlayer), ('slots', pcwbot.Player)):
+        start = time.time()
+        players = [model(*arg) for arg in args]
+        elapsed = time.time() - start
+        print "%-6s per player: construction=%.2fus memory=%d bytes" % (name, 1000000 * elapsed / count, object_size(players[0]))
+        del players
+
+    names = [arg[3] for arg in args]
+    start = time.time()
+    for name in names:
+        pcwbot.Player.strip_colors(name)
+    print "strip_colors per name=%.2fus" % (1000000 * (time.time() - start) / count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Send 'dumpuser' RCON commands to a local fake server with packet loss from
+an event loop, once with the blocking PyQuake3 and once with the
+non-blocking AsyncQuake3. Report the total time, the responses belonging
+to another player, and the longest stall of a 10ms heartbeat timer on the
+loop, i.e. how long log processing would have been held up. Then drain a
+burst of commands larger than the token bucket through the Rcon send queue
+on the event loop and compare the time with the rate limit.
+
+Usage: python -m benchmarks.rcon_client [<commands>] [<loss>]
+"""
+
+import sys
+import time
+
+import pcwbot
+
+from benchmarks.fakeserver import FakeQuake3Server
+
+PLAYERS = 20
+
+
+def heartbeat(loop, state, interval=.01):
+    """
+    measure the lateness of a periodic timer on the event loop
+    """
+    now = time.time()
+    if state.get('last'):
+        state['stall'] = max(state.get('stall', 0), now - state['last'] - interval)
+    state['last'] = now
+    if not state.get('done'):
+        loop.call_later(interval, heartbeat, loop, state)
+
+
+def check(results, num, values):
+    """
+    record the result of 'dumpuser num', False if it belongs to another player
+    """
+    results.append(values.get('name') == 'Player%02d' % (num % PLAYERS) if values is not None else None)
+
+
+def run_blocking(server, count):
+    """
+    one blocking command per loop iteration, as a handler on the event loop would do
+    """
+    loop = pcwbot.EventLoop()
+    quake = pcwbot.PyQuake3(server.get_address(), server.rcon_password)
+    results = []
+
+    def send(num):
+        try:
+            check(results, num, quake.rcon_dumpuser(num % PLAYERS))
+        except Exception:
+            check(results, num, None)
+        if num + 1 < count:
+            loop.call_soon(send, num + 1)
+        else:
+            loop.stop()
+    return run_loop(loop, lambda: send(0)), results
+
+
+def run_async(server, count):
+    """
+    all commands queued at once, AsyncQuake3 sends them one after the other
+    """
+    loop = pcwbot.EventLoop()
+    quake = pcwbot.AsyncQuake3(server.get_address(), server.rcon_password, loop)
+    results = []
+
+    def done(num, values):
+        check(results, num, values)
+        if len(results) == count:
+            loop.stop()
+
+    def send():
+        for num in xrange(count):
+            quake.rcon_dumpuser(num % PLAYERS, lambda values, error, num=num: done(num, values))
+    return run_loop(loop, send), results
+
+
+def run_loop(loop, start):
+    """
+    run the loop with a heartbeat until the client stops it, return the longest heartbeat stall
+    """
+    state = {}
+    loop.call_soon(heartbeat, loop, state)
+    loop.call_soon(start)
+    loop.run_forever()
+    state['done'] = True
+    return state.get('stall', 0)
+
+
+def run_queue(count, rate=20, burst=5):
+    """
+    push count commands at once to an Rcon on the event loop, return the drain time, the time the rate limit
+    allows and the commands which did not arrive within twice that time
+    """
+    server = FakeQuake3Server()
+    loop = pcwbot.EventLoop()
+    rcon = pcwbot.Rcon('127.0.0.1', server.port, server.rcon_password, rate=rate, burst=burst, loop=loop)
+    rcon.go_live()
+    expected = max(count - burst, 0) / float(rate)
+    state = {}
+
+    def wait():
+        if len(server.commands) >= count or time.time() > state['deadline']:
+            state['seconds'] = time.time() - state['start']
+            loop.stop()
+        else:
+            loop.call_later(.01, wait)
+
+    def send():
+        state['start'] = time.time()
+        state['deadline'] = state['start'] + 2 * expected + 1
+        for num in xrange(count):
+            rcon.push('say %d' % num)
+        wait()
+    loop.call_soon(send)
+    loop.run_forever()
+    return {'commands': count, 'rate': rate, 'burst': burst, 'seconds': state['seconds'], 'expected_seconds': expected,
+            'undelivered': count - len(server.commands)}
+
+
+def run(name, count, loss):
+    """
+    return total seconds, commands/sec, failed and mismatched responses and the longest loop stall of a client
+    """
+    server = FakeQuake3Server(loss=loss, players=[(num, 'Player%02d' % num, num, 50) for num in xrange(PLAYERS)])
+    start = time.time()
+    stall, results = {'blocking': run_blocking, 'async': run_async}[name](server, count)
+    elapsed = time.time() - start
+    return {'seconds': elapsed, 'commands_per_sec': count / elapsed, 'failed': results.count(None),
+            'mismatched': results.count(False), 'max_loop_stall_ms': 1000 * stall}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    loss = float(sys.argv[2]) if len(sys.argv) > 2 else .05
+    for name in ('blocking', 'async'):
+        result = run(name, count, loss)
+        print "%-9s commands=%d loss=%.0f%% total=%.3fs commands/sec=%d failed=%d mismatched=%d max loop stall=%.0fms" % (
+            name, count, loss * 100, result['seconds'], result['commands_per_sec'], result['failed'], result['mismatched'], result['max_loop_stall_ms'])
+    result = run_queue(min(count, 60))
+    print "queue     commands=%d rate=%d/s burst=%d total=%.3fs expected=%.3fs undelivered=%d" % (
+        result['commands'], result['rate'], result['burst'], result['seconds'], result['expected_seconds'], result['undelivered'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the former RCON status and getstatus parsers with the
+precompiled regular expressions of PyQuake3.
+
+Usage: python -m benchmarks.status_parse [<players>] [<rounds>]
+"""
+
+import sys
+import time
+
+import pcwbot
+from benchmarks.fakeserver import FakeQuake3Server
+from benchmarks.synthlog import player_name
+
+
+class FormerParser(pcwbot.PyQuake3):
+    """
+    PyQuake3 with the former parse_status and parse_rcon_status
+    """
+    def __init__(self):
+        self.players = []
+
+    def parse_status(self, data):
+        split = data[1:].split('\\')
+        values = dict(zip(split[::2], split[1::2]))
+        for var, val in values.items():
+            pos = val.find('\n')
+            if pos == -1:
+                continue
+            split = val.split('\n', 1)
+            values[var] = split[0]
+            self.parse_players(split[1])
+        return values
+
+    def parse_players(self, data):
+        self.players = []
+        for player in data.split('\n'):
+            if not player:
+                continue
+            match = self.player_reo.match(player)
+            if not match:
+                continue
+            frags, ping, name = match.groups()
+            self.players.append(pcwbot.Q3Player(1, name, frags, ping))
+
+    def parse_rcon_status(self, data):
+        lines = data.split('\n')
+        players = lines[3:]
+        self.players = []
+        for ply in players:
+            while ply.find('  ') != -1:
+                ply = ply.replace('  ', ' ')
+            while ply.find(' ') == 0:
+                ply = ply[1:]
+            if ply == '':
+                continue
+            ply = ply.split(' ')
+            try:
+                self.players.append(pcwbot.Q3Player(int(ply[0]), ply[3], int(ply[1]), int(ply[2]), ply[5]))
+            except (IndexError, ValueError):
+                continue
+
+
+class CurrentParser(pcwbot.PyQuake3):
+    """
+    PyQuake3 without a socket
+    """
+    def __init__(self):
+        self.players = []
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    # every 4th name contains a space
+    players = [(num, player_name(num) + (' clan' if num % 4 == 0 else ''), num * 3 - 10, 40 + num) for num in xrange(count)]
+    server = FakeQuake3Server(players=players)
+    status = server.status_text()
+    getstatus = server.getstatus_text()
+
+    print "players=%d rounds=%d" % (count, rounds)
+    for name, parser in (('former', FormerParser()), ('regex', CurrentParser())):
+        start = time.time()
+        for _ in xrange(rounds):
+            parser.parse_rcon_status(status)
+        rcon_elapsed = time.time() - start
+        spaced = len([player for player in parser.players if ' ' in player.name])
+        start = time.time()
+        for _ in xrange(rounds):
+            parser.parse_status(getstatus)
+        status_elapsed = time.time() - start
+        print "%-7s status=%.1fus (%d players, %d names with spaces) getstatus=%.1fus" % (name, 1000000 * rcon_elapsed / rounds, len(parser.players), spaced, 1000000 * status_elapsed / rounds)
+
+
+if __name__ == '__main__':
+    main()
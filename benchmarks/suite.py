@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reusable benchmark suite: every scenario runs in a fresh interpreter against
+synthetic games.log traffic and local fake UDP game servers, the results are
+printed and optionally written as JSON to compare runs.
+
+Scenarios:
+  e2e        end-to-end chat command latency (log line written -> RCON tell
+             received by the fake server), lines/sec, RCON packets/sec, CPU
+             and memory with the threaded bot and with the event loop
+  throughput lines/sec of the chunked reader and of the mmap replay
+  rcon       RCON commands/sec, wrong responses and event loop stalls of the
+             blocking and the non-blocking client with packet loss, drain
+             time of a burst through the rate-limited send queue
+  memory     memory per LogParser, Game and Rcon with a full server
+
+Usage: python -m benchmarks.suite [--quick] [--json <file>] [--rates <lines,userinfo,commands>]
+                                  [--duration <seconds>] [<scenario> ...]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+from threading import Thread
+
+import pcwbot
+
+from benchmarks import synthlog, log_throughput, rcon_client
+from benchmarks.fakeserver import FakeQuake3Server
+from benchmarks.measure import rss_kb, cpu_seconds, summarize, write_results
+from benchmarks.traffic import TrafficGenerator
+
+SCENARIOS = ['e2e', 'throughput', 'rcon', 'memory']
+
+tell_reo = re.compile(r'^tell 0 \^3Level \^\dPlayer\^7(\d+)')
+
+
+def match_latencies(traffic, server):
+    """
+    return the latencies of the chat commands, matched in order per player, and the number of unanswered commands
+    """
+    pending = {}
+    for written, victim in traffic.commands:
+        pending.setdefault(victim, []).append(written)
+    latencies = []
+    for command, received in zip(server.commands, server.command_times):
+        match = tell_reo.match(command)
+        if match and pending.get(int(match.group(1))):
+            latencies.append(received - pending[int(match.group(1))].pop(0))
+    return latencies, sum([len(times) for times in pending.values()])
+
+
+def run_e2e(directory, mode, rates, duration, players=20):
+    """
+    feed traffic to a bot in thread or loop mode, return the results once the traffic ended
+    """
+    server = FakeQuake3Server(players=[(num, synthlog.player_name(num), 0, 50) for num in xrange(players)])
+    path = os.path.join(directory, 'games.log')
+    open(path, 'w').close()
+    config = synthlog.write_config(directory, path, server_port=server.port, map_refresh=0, event_loop=int(mode == 'loop'))
+    base_rss = rss_kb()
+    parser = pcwbot.LogParser(config)
+    traffic = TrafficGenerator(path, rates[0], rates[1], rates[2], duration, players)
+    # let the bot go live before the traffic starts
+    settle = .5
+    result = {}
+
+    def finish():
+        traffic.join()
+        # the answers to the last commands
+        time.sleep(1)
+        latencies, lost = match_latencies(traffic, server)
+        result.update(summarize(latencies))
+        result.update({'mode': mode, 'rates': rates, 'seconds': duration, 'lost': lost, 'written': traffic.written,
+                       'lines_per_sec': parser.line_count / float(duration), 'rcon_packets_per_sec': server.received / float(duration),
+                       'cpu_percent': 100 * (cpu_seconds() - start_cpu) / (duration + 1), 'rss_kb': rss_kb() - base_rss})
+
+    start_cpu = cpu_seconds()
+    if mode == 'loop':
+        loop = pcwbot.EventLoop()
+        parser.start(loop)
+        loop.call_later(settle, traffic.start)
+        loop.call_later(settle + duration + 1.5, loop.stop)
+        loop.run_forever()
+        finish()
+        return result
+    # read_log never returns, report from another thread
+    reporter = Thread(target=lambda: (time.sleep(settle), traffic.start(), finish(), report(result, directory)))
+    reporter.setDaemon(True)
+    reporter.start()
+    parser.read_log()
+
+
+def run_throughput(directory, megabytes):
+    """
+    return lines/sec of the chunked reader and of the mmap replay
+    """
+    path = os.path.join(directory, 'games.log')
+    total = synthlog.write_log(path, int(megabytes * 1024 * 1024))
+    result = {'lines': total, 'megabytes': os.path.getsize(path) / 1048576.0}
+    for name, replay in (('chunked', log_throughput.replay_chunked), ('mmap', log_throughput.replay_mmap)):
+        parser = synthlog.create_parser(path, tail_backend='poll')
+        start = time.time()
+        count = replay(parser, path)
+        result['%s_lines_per_sec' % name] = count / (time.time() - start)
+    return result
+
+
+def run_rcon(count, loss):
+    """
+    return commands/sec, wrong responses and the longest event loop stall of the blocking and of the non-blocking client
+    and the drain time of the send queue
+    """
+    result = {'commands': count, 'loss': loss}
+    for name in ('blocking', 'async'):
+        for key, value in rcon_client.run(name, count, loss).items():
+            result['%s_%s' % (name, key)] = value
+    queue = rcon_client.run_queue(60)
+    result.update({'queue_seconds': queue['seconds'], 'queue_expected_seconds': queue['expected_seconds'],
+                   'queue_undelivered': queue['undelivered']})
+    return result
+
+
+def run_memory(directory, servers, players=64):
+    """
+    return the memory of LogParser, Game and Rcon per server with all slots taken
+    """
+    path = os.path.join(directory, 'games.log')
+    open(path, 'w').close()
+    config = os.path.join(directory, 'settings.conf')
+    with open(config, 'w') as config_file:
+        config_file.write('[bot]\nevent_loop = 1\nmap_refresh = 0\n')
+        for num in xrange(servers):
+            fake = FakeQuake3Server()
+            config_file.write('\n[server:%d]\nserver_ip = 127.0.0.1\nserver_port = %d\nrcon_password = secret\nlog_file = %s\n' % (num, fake.port, path))
+    loop = pcwbot.EventLoop()
+    base_rss = rss_kb()
+    parsers = []
+    for num in xrange(servers):
+        parser = pcwbot.LogParser(config, 'server:%d' % num)
+        parser.start(loop)
+        with parser.players_lock:
+            for slot in xrange(players):
+                parser.handle_userinfo(synthlog.userinfo(slot))
+        parsers.append(parser)
+    used = rss_kb() - base_rss
+    return {'servers': servers, 'players': players, 'rss_kb': used, 'kb_per_server': used / float(servers),
+            'known_players': sum([len(bot.game.players) for bot in parsers])}
+
+
+def report(result, directory):
+    """
+    hand the result of a scenario to the parent process and exit without tearing down the bot threads
+    """
+    shutil.rmtree(directory, True)
+    sys.stderr.write('%s\n' % json.dumps(result))
+    sys.stderr.flush()
+    os._exit(0)
+
+
+def run_child(scenario, params):
+    """
+    run one scenario in this interpreter
+    """
+    directory = tempfile.mkdtemp(prefix='pcwbot-bench-')
+    try:
+        os.chdir(directory)
+        synthlog.setup_database(os.path.join(directory, 'data.sqlite'))
+        if scenario == 'e2e':
+            result = run_e2e(directory, params['mode'], params['rates'], params['duration'])
+        elif scenario == 'throughput':
+            result = run_throughput(directory, params['megabytes'])
+        elif scenario == 'rcon':
+            result = run_rcon(params['commands'], params['loss'])
+        else:
+            result = run_memory(directory, params['servers'])
+    except Exception:
+        shutil.rmtree(directory, True)
+        raise
+    report(result, directory)
+
+
+def spawn(scenario, params):
+    """
+    run one scenario in a fresh interpreter, return its result
+    """
+    proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.suite', '--run', scenario, json.dumps(params)],
+                            stdout=open(os.devnull, 'w'), stderr=subprocess.PIPE, cwd=os.getcwd())
+    output = proc.communicate()[1].strip().split('\n')
+    try:
+        return json.loads(output[-1])
+    except ValueError:
+        return {'error': '\n'.join(output[-5:])}
+
+
+def print_result(name, result):
+    if 'error' in result:
+        print "%-18s failed: %s" % (name, result['error'])
+        return
+    print "%-18s %s" % (name, ' '.join(['%s=%s' % (key, '%.2f' % value if isinstance(value, float) else value)
+                                        for key, value in sorted(result.items()) if not isinstance(value, dict)]))
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ['--run']:
+        run_child(args[1], json.loads(args[2]))
+        return
+    quick = '--quick' in args
+    options = {'--json': None, '--rates': '500,2,5', '--duration': '2' if quick else '10'}
+    scenarios = []
+    while args:
+        arg = args.pop(0)
+        if arg in options:
+            options[arg] = args.pop(0)
+        elif arg in SCENARIOS:
+            scenarios.append(arg)
+    rates = [float(rate) for rate in options['--rates'].split(',')]
+    duration = float(options['--duration'])
+
+    runs = []
+    for scenario in scenarios or SCENARIOS:
+        if scenario == 'e2e':
+            runs.extend([('e2e %s' % mode, scenario, {'mode': mode, 'rates': rates, 'duration': duration}) for mode in ('thread', 'loop')])
+        elif scenario == 'throughput':
+            runs.append(('throughput', scenario, {'megabytes': 2 if quick else 16}))
+        elif scenario == 'rcon':
+            runs.append(('rcon', scenario, {'commands': 100 if quick else 300, 'loss': .05}))
+        else:
+            runs.append(('memory', scenario, {'servers': 4}))
+    results = {}
+    for name, scenario, params in runs:
+        results[name] = spawn(scenario, params)
+        print_result(name, results[name])
+    if options['--json']:
+        write_results(options['--json'], results)
+
+
+if __name__ == '__main__':
+    main()
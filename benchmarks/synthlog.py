@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic Urban Terror games.log generator and helpers to set up pcwbot
+without a game server.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+
+import pcwbot
+
+WEAPONS = ['UT_MOD_LR300', 'UT_MOD_AK103', 'UT_MOD_G36', 'UT_MOD_SPAS', 'UT_MOD_DEAGLE', 'UT_MOD_HK69', 'UT_MOD_SR8']
+ITEMS = ['ut_weapon_lr', 'ut_weapon_ak103', 'ut_item_vest', 'ut_item_helmet', 'team_CTF_redflag', 'team_CTF_blueflag']
+BODY_PARTS = ['Head', 'Helmet', 'Torso', 'Vest', 'Left Arm', 'Right Arm', 'Groin', 'Legs']
+COMMANDS = ['!list', '!help', '!force %s red', '!kick %s', '!map casa', '!setnextmap turn', '!leveltest %s', 'gg', 'nice one']
+
+
+def player_name(num):
+    """
+    return a colored player name for the given slot
+    """
+    return '^%dPlayer^7%02d' % (num % 10, num)
+
+
+def userinfo(num, name=None):
+    """
+    return the payload of a ClientUserinfo line
+    """
+    return ('%d \\ip\\10.0.%d.%d:27960\\name\\%s\\racered\\2\\raceblue\\2\\rate\\25000\\ut_timenudge\\0'
+            '\\cg_rgb\\128 128 128\\funred\\ninja,caprd,flag\\funblue\\ninja,capbl,flag\\cg_predictitems\\0'
+            '\\cl_anonymous\\0\\sex\\male\\handicap\\100\\color2\\5\\color1\\4\\team_headmodel\\*james'
+            '\\team_model\\james\\headmodel\\sarge\\model\\sarge\\snaps\\20\\teamtask\\0'
+            '\\cl_guid\\%032X\\weapmodes\\00000110220000020002\\gear\\GZAAVWT\\authl\\0'
+            '\\cl_time\\0\\racefree\\0\\password\\secret' % (num, num // 256, num % 256, name or player_name(num), 0xABCDEF0000 + num))
+
+
+def generate_lines(count, players=20, seed=1):
+    """
+    generate CTF-like log lines of one map, mostly Kill, Hit and Item spam with some userinfo churn and chat commands
+    """
+    rnd = random.Random(seed)
+    choice = rnd.choice
+    yield '  0:00 InitGame: \\sv_allowvote\\1\\g_gametype\\7\\sv_maxclients\\%d\\mapname\\ut4_turnpike\n' % players
+    for num in xrange(players):
+        yield '  0:00 ClientUserinfo: %s\n' % userinfo(num)
+    for idx in xrange(count):
+        stamp = '%3d:%02d' % ((idx // 600) % 1000, (idx // 10) % 60)
+        killer = rnd.randrange(players)
+        victim = rnd.randrange(players)
+        roll = rnd.random()
+        if roll < .35:
+            yield '%s Hit: %d %d %d 12: %s hit %s in the %s\n' % (stamp, victim, killer, rnd.randrange(8), player_name(killer), player_name(victim), choice(BODY_PARTS))
+        elif roll < .6:
+            yield '%s Kill: %d %d 19: %s killed %s by %s\n' % (stamp, killer, victim, player_name(killer), player_name(victim), choice(WEAPONS))
+        elif roll < .85:
+            yield '%s Item: %d %s\n' % (stamp, killer, choice(ITEMS))
+        elif roll < .9:
+            yield '%s ClientUserinfoChanged: %d n\\%s\\t\\%d\\r\\0\\tl\\0\\f0\\\\f1\\\\f2\\\\a0\\0\\a1\\0\\a2\\0\n' % (stamp, killer, player_name(killer), killer % 2 + 1)
+        elif roll < .94:
+            yield '%s ClientUserinfo: %s\n' % (stamp, userinfo(killer))
+        elif roll < .98:
+            command = choice(COMMANDS)
+            if '%s' in command:
+                command = command % player_name(victim)[-2:]
+            yield '%s say: %d %s: %s\n' % (stamp, killer, player_name(killer), command)
+        elif roll < .99:
+            yield '%s ClientDisconnect: %d\n' % (stamp, killer)
+            yield '%s ClientUserinfo: %s\n' % (stamp, userinfo(killer))
+        else:
+            yield '%s InitRound: \\sv_allowvote\\1\\g_gametype\\7\\sv_maxclients\\%d\\mapname\\ut4_turnpike\n' % (stamp, players)
+
+
+def write_log(path, size, players=20, seed=1):
+    """
+    write a synthetic games log file of at least the given size in bytes, return the number of lines
+    """
+    count = 0
+    written = 0
+    with open(path, 'w') as log_file:
+        while written < size:
+            for line in generate_lines(10000, players, seed + count):
+                log_file.write(line)
+                written += len(line)
+                count += 1
+    return count
+
+
+def setup_database(path=None):
+    """
+    create the tables and install the connection and the writer as the pcwbot database
+    """
+    if path is None:
+        handle, path = tempfile.mkstemp(prefix='pcwbot-bench-', suffix='.sqlite')
+        os.close(handle)
+    pcwbot.conn = sqlite3.connect(path)
+    pcwbot.curs = pcwbot.conn.cursor()
+    pcwbot.migrate_database(pcwbot.conn)
+    pcwbot.curs.execute("INSERT INTO `admins` (`guid`,`name`,`ip_address`,`admin_role`) VALUES (?,?,?,?)", ('%032X' % 0xABCDEF0000, 'Player00', '10.0.0.0', 100))
+    pcwbot.conn.commit()
+    pcwbot.admin_cache = pcwbot.AdminCache(path)
+    pcwbot.db_writer = pcwbot.DatabaseWriter(path)
+    return pcwbot.conn
+
+
+def write_config(directory, log_path, **options):
+    """
+    write a pcwbot configuration file for the given games log, return its path
+    """
+    path = os.path.join(directory, 'settings.conf')
+    with open(path, 'w') as config_file:
+        config_file.write('[server]\nserver_ip = 127.0.0.1\nserver_port = %s\nrcon_password = secret\nlog_file = %s\n\n[bot]\n'
+                          % (options.pop('server_port', 27960), log_path))
+        for option, value in sorted(options.items()):
+            config_file.write('%s = %s\n' % (option, value))
+    return path
+
+
+def create_parser(log_path, **options):
+    """
+    return a LogParser with a Game for the given games log, without going live
+    """
+    parser = pcwbot.LogParser(write_config(os.path.dirname(log_path), log_path, **options))
+    parser.game = pcwbot.Game(parser.config_file)
+    return parser
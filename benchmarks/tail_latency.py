@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the latency between writing a line to games.log and handing it to
+the parser for every available tail backend.
+
+Usage: python -m benchmarks.tail_latency [<lines>] [<delay>]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from threading import Thread
+
+import pcwbot
+
+from benchmarks.measure import percentile
+
+
+class TailReader(Thread):
+    """
+    read lines from a tail backend like LogParser.read_log does
+    """
+    def __init__(self, tail, expected):
+        Thread.__init__(self)
+        self.setDaemon(True)
+        self.tail = tail
+        self.expected = expected
+        self.latencies = []
+        self.wakeups = 0
+
+    def run(self):
+        while len(self.latencies) < self.expected:
+            lines = self.tail.read_lines()
+            if lines:
+                now = time.time()
+                self.latencies.extend([now - float(line.split()[2]) for line in lines])
+            else:
+                self.wakeups += 1
+                self.tail.wait()
+
+
+def run(backend, path, lines, delay):
+    log_file = open(path, 'w')
+    tail_class = {'poll': pcwbot.PollingTail, 'inotify': pcwbot.InotifyTail}[backend]
+    tail = tail_class(path)
+    reader = TailReader(tail, lines)
+    reader.start()
+    for num in xrange(lines):
+        if num == lines // 2:
+            # rotate the log file halfway through
+            log_file.close()
+            os.rename(path, path + '.1')
+            log_file = open(path, 'w')
+        log_file.write('  0:00 say: %.6f 0 Player: !list\n' % time.time())
+        log_file.flush()
+        time.sleep(delay)
+    reader.join(10)
+    log_file.close()
+    tail.close()
+    # count the wakeups of an idle tail within one second
+    idle = TailReader(tail_class(path), 1)
+    idle.start()
+    time.sleep(1)
+    wakeups = idle.wakeups
+    # let the idle reader finish instead of leaving it waiting at exit
+    with open(path, 'a') as log_file:
+        log_file.write('  0:00 say: %.6f 0 Player: !list\n' % time.time())
+    idle.join(10)
+    idle.tail.close()
+    if len(reader.latencies) < lines:
+        print "%-8s lost %d of %d lines" % (backend, lines - len(reader.latencies), lines)
+        return
+    print "%-8s lines=%d mean=%.2fms p50=%.2fms p99=%.2fms max=%.2fms idle_wakeups/s=%d" % (
+        backend, lines, 1000 * sum(reader.latencies) / lines, 1000 * percentile(reader.latencies, 50),
+        1000 * percentile(reader.latencies, 99), 1000 * max(reader.latencies), wakeups)
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else .01
+    directory = tempfile.mkdtemp(prefix='pcwbot-bench-')
+    try:
+        backends = ['poll', 'inotify'] if sys.platform.startswith('linux') else ['poll']
+        for backend in backends:
+            run(backend, os.path.join(directory, 'games.log'), lines, delay)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare wrapping private messages with textwrap, as the former
+Game.rcon_tell did, with the color code aware MessageFormatter without
+and with its cache, for a !list message and a usage text.
+
+Usage: python -m benchmarks.tell_format [<players>] [<rounds>]
+"""
+
+import sys
+import time
+import textwrap
+
+import pcwbot
+from benchmarks.synthlog import player_name
+
+
+def measure(wrap, msg, rounds):
+    """
+    return the microseconds per call and the wrapped lines
+    """
+    start = time.time()
+    for _ in xrange(rounds):
+        lines = wrap(msg)
+    return 1000000 * (time.time() - start) / rounds, lines
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    messages = (('list', "^7Current players: %s" % ", ".join(["^3%s [^2%d^3]" % (player_name(num), num) for num in xrange(count)])),
+                ('usage', "^7Usage: !force <name> <blue/red/spec>"))
+    formatter = pcwbot.MessageFormatter(128)
+
+    def uncached(msg):
+        formatter.cache.clear()
+        return formatter.wrap(msg)
+
+    print "players=%d rounds=%d" % (count, rounds)
+    for name, msg in messages:
+        for method, wrap in (('textwrap', lambda msg: textwrap.wrap(msg, 128)), ('formatter', uncached), ('cached', formatter.wrap)):
+            elapsed, lines = measure(wrap, msg, rounds)
+            widths = [pcwbot.MessageFormatter.visible_length(line) for line in lines]
+            print "%-6s %-10s per message=%.2fus lines=%d visible widths=%s" % (name, method, elapsed, len(lines), widths)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Append synthetic Urban Terror log traffic to a games.log in real time.
+"""
+
+import time
+
+from threading import Thread
+
+from benchmarks import synthlog
+
+
+class TrafficGenerator(Thread):
+    """
+    write kill/hit/item spam, userinfo churn and chat commands at the given rates per second
+
+    The chat commands are '!leveltest <player>' of the head admin in slot 0, each
+    one is answered with exactly one 'tell 0 ^3Level <name> ...' RCON command.
+    """
+    def __init__(self, path, line_rate=200, userinfo_rate=2, command_rate=5, duration=5, players=20, seed=1):
+        """
+        create a new generator, start() writes the userinfo of all players first
+
+        @param path: The games log file, lines are appended
+        @param line_rate: Background lines per second
+        @param userinfo_rate: ClientUserinfo lines with a changed name per second
+        @param command_rate: Chat commands per second
+        @param duration: Seconds of traffic
+        """
+        Thread.__init__(self, name='traffic')
+        self.setDaemon(True)
+        self.path = path
+        self.rates = (line_rate, userinfo_rate, command_rate)
+        self.duration = duration
+        self.players = players
+        self.seed = seed
+        # (time written, victim slot) of every chat command
+        self.commands = []
+        self.written = 0
+
+    def background(self):
+        """
+        endless background lines without chat, which would add RCON traffic
+        """
+        seed = self.seed
+        while 1:
+            for line in synthlog.generate_lines(10000, self.players, seed):
+                if ' say: ' not in line:
+                    yield line
+            seed += 1
+
+    def run(self):
+        log_file = open(self.path, 'a')
+        for num in xrange(self.players):
+            log_file.write('  0:00 ClientUserinfo: %s\n' % synthlog.userinfo(num))
+        log_file.flush()
+        background = self.background()
+        done = [0, 0, 0]
+        start = time.time()
+        while 1:
+            elapsed = time.time() - start
+            if elapsed >= self.duration:
+                break
+            due = [int(rate * elapsed) for rate in self.rates]
+            for _ in xrange(due[0] - done[0]):
+                log_file.write(next(background))
+            for num in xrange(done[1], due[1]):
+                slot = 1 + num % (self.players - 1)
+                log_file.write('  1:00 ClientUserinfo: %s\n' % synthlog.userinfo(slot, '%s^5x%d' % (synthlog.player_name(slot), num)))
+            for num in xrange(done[2], due[2]):
+                victim = 1 + num % (self.players - 1)
+                log_file.write('  1:00 say: 0 %s: !leveltest Player%02d\n' % (synthlog.player_name(0), victim))
+                self.commands.append((time.time(), victim))
+            self.written += sum(due) - sum(done)
+            done = due
+            log_file.flush()
+            time.sleep(.01)
+        log_file.close()
+
+    def expected_tell(self, victim):
+        """
+        return the start of the RCON command answering the chat command about the victim
+        """
+        return 'tell 0 ^3Level %s' % synthlog.player_name(victim)
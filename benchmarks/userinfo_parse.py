@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the former explode_line userinfo parsing with
+LogParser.extract_userinfo, and measure handle_userinfo on a stream of
+userinfo lines where most slots resend an unchanged userinfo.
+
+Usage: python -m benchmarks.userinfo_parse [<lines>]
+"""
+
+import re
+import sys
+import time
+import shutil
+import tempfile
+
+import pcwbot
+from benchmarks import synthlog
+
+
+def explode_line(line):
+    """
+    the former LogParser.explode_line
+    """
+    arr = line.lstrip().lstrip('\\').split('\\')
+    key = True
+    key_val = None
+    values = {}
+    for item in arr:
+        if key:
+            key_val = item
+            key = False
+        else:
+            values[key_val.rstrip()] = item.rstrip()
+            key_val = None
+            key = True
+    return values
+
+
+def former_parse(info):
+    """
+    name, ip address and guid as extracted by the former handle_userinfo
+    """
+    values = explode_line(info)
+    name = re.sub(r"\s+", "", values['name']) if 'name' in values else "UnnamedPlayer"
+    ip_port = values['ip'] if 'ip' in values else "0.0.0.0:0"
+    guid = values['cl_guid'] if 'cl_guid' in values else "None"
+    return name, ip_port.split(":")[0].strip(), guid
+
+
+def current_parse(info):
+    """
+    name, ip address and guid as extracted by handle_userinfo
+    """
+    name, ip_port, guid = pcwbot.LogParser.extract_userinfo(info, ('name', 'ip', 'cl_guid'))
+    return "".join(name.split()), ip_port.split(":")[0].strip(), guid
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # 20 slots, a name change on every 10th line
+    payloads = [synthlog.userinfo(num % 20, 'Player %d' % (num // 200) if num % 10 == 0 else None) for num in xrange(count)]
+    infos = [payload.partition(' ')[2].lstrip('\\') for payload in payloads]
+
+    assert former_parse(infos[0]) == current_parse(infos[0])
+    print "lines=%d keys per userinfo=%d" % (count, infos[0].count('\\') // 2 + 1)
+    for name, parse in (('explode', former_parse), ('extract', current_parse)):
+        start = time.time()
+        for info in infos:
+            parse(info)
+        print "%-8s per line=%.2fus" % (name, 1000000 * (time.time() - start) / count)
+
+    directory = tempfile.mkdtemp(prefix='pcwbot-bench-')
+    try:
+        synthlog.setup_database()
+        log_path = '%s/games.log' % directory
+        synthlog.write_log(log_path, 0)
+        parser = synthlog.create_parser(log_path, tail_backend='poll')
+        for name, forget in (('every line', True), ('changed only', False)):
+            start = time.time()
+            # the handlers run with the players lock held, as in a batch of log lines
+            with parser.players_lock:
+                for payload in payloads:
+                    if forget:
+                        parser.userinfo.clear()
+                    parser.handle_userinfo(payload)
+            print "handle_userinfo %-12s per line=%.2fus players=%d" % (name, 1000000 * (time.time() - start) / count, len(parser.game.players))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the startup time until pcwbot would go live on a large synthetic
+games.log: starting at the end of the file, replaying since the last
+InitGame (warm_start) and replaying the whole file.
+
+Usage: python -m benchmarks.warm_start [<megabytes>]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from benchmarks import synthlog
+
+
+def start_parser(path, mode):
+    """
+    create a LogParser and read the games log up to its end like read_log, return the number of lines
+    """
+    parser = synthlog.create_parser(path, tail_backend='poll', warm_start=int(mode == 'warm'))
+    if mode == 'full':
+        parser.log_tail.open_log()
+        parser.replaying = True
+    count = 0
+    while 1:
+        lines = parser.log_tail.read_lines()
+        if not lines:
+            return parser, count
+        parser.parse_lines(lines)
+        count += len(lines)
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 64
+    directory = tempfile.mkdtemp(prefix='pcwbot-bench-')
+    try:
+        path = os.path.join(directory, 'games.log')
+        synthlog.write_log(path, int(megabytes * 1024 * 1024))
+        print "games log: %.1f MB" % (os.path.getsize(path) / 1048576.0)
+        synthlog.setup_database()
+        for mode in ('cold', 'warm', 'full'):
+            start = time.time()
+            parser, count = start_parser(path, mode)
+            elapsed = time.time() - start
+            players = len([num for num in parser.game.players if num != 1022])
+            print "%-5s startup=%.3fs replayed lines=%d known players=%d" % (mode, elapsed, count, players)
+            parser.log_tail.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
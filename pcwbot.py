@@ -21,24 +21,394 @@ Run the bot: python pcwbot.py
 
 __version__ = '0.9.10'
 
+DATABASE = './data.sqlite'
+
 
 ### IMPORTS
+import os
 import re
+import sys
 import time
+import mmap
+import fcntl
+import errno
+import heapq
+import bisect
+import ctypes
+import ctypes.util
+import select
+import shutil
+import struct
+import signal
 import sqlite3
-import textwrap
+import tempfile
 import ConfigParser
+import BaseHTTPServer
 import socket
+import threading
 
 from Queue import Queue
+from Queue import Empty
+from collections import deque
+from collections import OrderedDict
+from itertools import chain
 from threading import Thread
+from threading import Lock
 from threading import RLock
+from threading import Condition
+from threading import Event
+
+
+### CLASS Metrics ###
+class Histogram(object):
+    """
+    cumulative histogram in the Prometheus style
+    """
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        """
+        create a new instance of Histogram
+
+        @param buckets: The sorted upper bounds of the buckets
+        @type  buckets: Tuple
+        """
+        self.buckets = buckets
+        # one count per bucket and one for the values above the last bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        add a value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics(object):
+    """
+    counters, gauges and histograms of the bot, rendered in the Prometheus text format
+    """
+    latency_buckets = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5)
+
+    def __init__(self):
+        """
+        create a new instance of Metrics
+        """
+        # a plain lock, the RLock of Python 2 is much slower on this hot path
+        self.lock = Lock()
+        # name -> (type, help text)
+        self.descriptions = OrderedDict()
+        # (name, labels) -> value or Histogram, labels are tuples of (label, value) pairs
+        self.values = {}
+        # callables which return a list of (name, labels, value) of values kept elsewhere
+        self.collectors = []
+
+    def describe(self, name, kind, text):
+        """
+        add the type and the help text of a metric
+
+        @param name: The metric name
+        @type  name: String
+        @param kind: counter, gauge or histogram
+        @type  kind: String
+        @param text: The help text
+        @type  text: String
+        """
+        self.descriptions[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        """
+        increase a counter
+        """
+        key = (name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        """
+        add a value to a histogram
+        """
+        key = (name, labels)
+        with self.lock:
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = Histogram(self.latency_buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collector):
+        """
+        add a callable which returns a list of (name, labels, value) when the metrics are rendered
+        """
+        self.collectors.append(collector)
+
+    @staticmethod
+    def format_labels(labels, extra=''):
+        """
+        return the label set of a sample, e.g. {action="say"}
+        """
+        items = ['%s="%s"' % (label, str(value).replace('\\', '\\\\').replace('"', '\\"')) for label, value in labels]
+        if extra:
+            items.append(extra)
+        return '{%s}' % ','.join(items) if items else ''
+
+    def render(self):
+        """
+        return all metrics in the Prometheus text format
+        """
+        samples = {}
+        with self.lock:
+            for (name, labels), value in self.values.iteritems():
+                if isinstance(value, Histogram):
+                    value = (list(value.counts), value.total, value.count)
+                samples.setdefault(name, []).append((labels, value))
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                samples.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, (kind, text) in self.descriptions.iteritems():
+            lines.append('# HELP %s %s' % (name, text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for labels, value in sorted(samples.get(name, [])):
+                if kind != 'histogram':
+                    lines.append('%s%s %s' % (name, self.format_labels(labels), repr(value)))
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(self.latency_buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    lines.append('%s_bucket%s %d' % (name, self.format_labels(labels, 'le="%s"' % bound), cumulative))
+                lines.append('%s_sum%s %r' % (name, self.format_labels(labels), total))
+                lines.append('%s_count%s %d' % (name, self.format_labels(labels), count))
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    answer GET /metrics with the metrics of the bot
+    """
+    def do_GET(self):
+        """
+        send the rendered metrics
+        """
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics.render()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        do not log the requests of the scraper
+        """
+        pass
+
+
+def start_metrics_server(address, port):
+    """
+    serve the metrics over HTTP in a background thread
+
+    @param address: The address to listen on, e.g. 127.0.0.1
+    @type  address: String
+    @param port: The TCP port
+    @type  port: Integer
+    """
+    server = BaseHTTPServer.HTTPServer((address, port), MetricsHandler)
+    server_thread = Thread(target=server.serve_forever)
+    server_thread.setDaemon(True)
+    server_thread.start()
+    return server
+
+
+### CLASS Profiler ###
+class SamplingProfiler(object):
+    """
+    sample the stacks of all threads and write them in the folded format of flamegraph.pl
+    """
+    def __init__(self, path, interval=.01):
+        """
+        create a new instance of SamplingProfiler
+
+        @param path: The file the folded stacks are written to
+        @type  path: String
+        @param interval: The seconds between two samples
+        @type  interval: Float
+        """
+        self.path = path
+        self.interval = interval
+        self.running = False
+        self.sampler = None
+        # folded stack -> number of samples
+        self.stacks = {}
+        self.samples = 0
+        # code object -> frame label
+        self.labels = {}
+
+    def start(self):
+        """
+        start sampling in a background thread
+        """
+        if self.running:
+            return
+        self.running = True
+        self.sampler = Thread(target=self.sample, name='profiler')
+        self.sampler.setDaemon(True)
+        self.sampler.start()
+
+    def stop(self):
+        """
+        stop sampling and write the collected stacks
+        """
+        if not self.running:
+            return
+        self.running = False
+        self.sampler.join()
+        self.write()
+
+    def toggle(self):
+        """
+        start or stop sampling, used by the signal handler
+        """
+        if self.running:
+            self.stop()
+            print "- Profiler stopped, %d samples written to '%s'." % (self.samples, self.path)
+        else:
+            self.start()
+            print "- Profiler started."
+
+    def sample(self):
+        """
+        Thread process, record the stack of every other thread each interval
+        """
+        own = threading.current_thread().ident
+        labels = self.labels
+        while self.running:
+            names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                calls = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+                    calls.append(label)
+                    frame = frame.f_back
+                calls.append(names.get(ident, 'thread-%d' % ident))
+                calls.reverse()
+                stack = ';'.join(calls)
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def write(self):
+        """
+        write the folded stacks, one 'thread;outer;...;inner count' line per stack
+        """
+        with open(self.path, 'w') as profile_file:
+            for stack, count in sorted(self.stacks.iteritems()):
+                profile_file.write('%s %d\n' % (stack, count))
+
+
+class SlowLog(object):
+    """
+    record log lines and RCON commands which took longer than a threshold
+    """
+    def __init__(self):
+        """
+        create a new instance of SlowLog, disabled until it is opened
+        """
+        self.threshold = 0
+        self.log_file = None
+        self.lock = Lock()
+
+    def open(self, path, threshold):
+        """
+        start recording
+
+        @param path: The file the slow entries are appended to
+        @type  path: String
+        @param threshold: The minimum duration in seconds of a recorded entry
+        @type  threshold: Float
+        """
+        self.log_file = open(path, 'a')
+        self.threshold = threshold
+
+    def check(self, kind, elapsed, detail):
+        """
+        record the entry if it took longer than the threshold
+
+        @param kind: The slow path, e.g. parse_line, rcon or lock
+        @type  kind: String
+        @param elapsed: The duration in seconds
+        @type  elapsed: Float
+        @param detail: The log line, the RCON command or the lock
+        @type  detail: String
+        """
+        if self.threshold and elapsed >= self.threshold:
+            with self.lock:
+                self.log_file.write('%s %s %.3fs %s [%s]\n' % (time.strftime('%Y-%m-%d %H:%M:%S'), kind, elapsed, detail.rstrip(), threading.current_thread().name))
+                self.log_file.flush()
+
+
+class TimedLock(object):
+    """
+    lock which records long waits for it in the slow log
+    """
+    def __init__(self, name, lock=None):
+        """
+        create a new instance of TimedLock
+
+        @param name: The name of the lock in the slow log
+        @type  name: String
+        @param lock: The wrapped lock, a new RLock by default
+        @type  lock: Instance
+        """
+        self.name = name
+        self.lock = lock or RLock()
+
+    def __enter__(self):
+        # only a lock held by another thread is timed
+        if self.lock.acquire(False):
+            return
+        start = time.time()
+        self.lock.acquire()
+        slow_log.check('lock', time.time() - start, self.name)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.lock.release()
+
+
+metrics = Metrics()
+metrics.describe('pcwbot_log_lines_total', 'counter', 'Lines read from the games log.')
+metrics.describe('pcwbot_log_actions_total', 'counter', 'Handled games log lines by action.')
+metrics.describe('pcwbot_handler_errors_total', 'counter', 'Exceptions raised by the handler of a log action.')
+metrics.describe('pcwbot_command_latency_seconds', 'histogram', 'Time from reading a chat command from the log until its RCON commands are queued.')
+metrics.describe('pcwbot_command_queue_depth', 'gauge', 'Chat commands waiting for a command worker.')
+metrics.describe('pcwbot_rcon_queue_depth', 'gauge', 'RCON commands waiting in the send queue.')
+metrics.describe('pcwbot_rcon_queue_latency_seconds', 'histogram', 'Time from queueing an RCON command until it has been sent.')
+metrics.describe('pcwbot_rcon_commands_total', 'counter', 'Queued RCON commands by result.')
+metrics.describe('pcwbot_rcon_rtt_seconds', 'histogram', 'Round trip time of RCON and status requests.')
+metrics.describe('pcwbot_rcon_retries_total', 'counter', 'Resent RCON and status requests.')
+metrics.describe('pcwbot_rcon_timeouts_total', 'counter', 'RCON and status requests without response.')
+metrics.describe('pcwbot_sqlite_seconds', 'histogram', 'Duration of sqlite queries and write transactions.')
+slow_log = SlowLog()
 
 
 class Q3Player(object):
     """
     Q3Player class
     """
+    __slots__ = ('num', 'name', 'frags', 'ping', 'address', 'bot')
+
     def __init__(self, num, name, frags, ping, address=None, bot=-1):
         """
         create a new instance of Q3Player
@@ -58,13 +428,17 @@ class PyQuake3(object):
     Copyright (C) 2006-2007 Gerald Kaszuba
     """
     packet_prefix = '\xff' * 4
-    player_reo = re.compile(r'^(\d+) (\d+) "(.*)"')
+    player_reo = re.compile(r'^(-?\d+) (\d+) "(.*)"$', re.M)
+    # num score ping name lastmsg address qport rate, the name is padded and may contain spaces,
+    # the ping of connecting players is CNCT and of disconnected players still holding the slot ZMBI
+    status_reo = re.compile(r'^ *(\d+) +(-?\d+) +(\d+|CNCT|ZMBI) (.*?) +\d+ +(\S+) +\d+ +\d+ *$', re.M)
 
     rcon_password = None
     port = None
     address = None
     players = None
     values = None
+    metric_labels = ()
 
     def __init__(self, server, rcon_password=''):
         """
@@ -84,6 +458,7 @@ class PyQuake3(object):
             raise ValueError('Server address format must be: "address:port"')
         self.port = int(self.port)
         self.sock.connect((self.address, self.port))
+        self.metric_labels = (('server', self.get_address()),)
 
     def get_address(self):
         """
@@ -113,26 +488,62 @@ class PyQuake3(object):
         except socket.error, err:
             raise Exception('Error receiving the packet: %s' % err[1])
 
-    def command(self, cmd, timeout=1, retries=5):
+    def command(self, cmd, timeout=1, retries=5, multipacket=False):
         """
         send command and receive response
         """
+        self.discard_pending()
         while retries:
+            sent = time.time()
             self.send_packet(cmd)
             try:
                 data = self.recv(timeout)
             except Exception:
                 data = None
             if data:
-                return self.parse_packet(data)
+                metrics.observe('pcwbot_rcon_rtt_seconds', time.time() - sent, self.metric_labels)
+                response = self.parse_packet(data)
+                if multipacket:
+                    response = self.recv_remaining(response)
+                return response
             retries -= 1
+            if retries:
+                metrics.inc('pcwbot_rcon_retries_total', self.metric_labels)
+        metrics.inc('pcwbot_rcon_timeouts_total', self.metric_labels)
         raise Exception('Server response timed out')
 
-    def rcon(self, cmd):
+    def discard_pending(self):
+        """
+        drop late responses of earlier commands, they would be taken for the response of the next command
+        """
+        self.sock.settimeout(0)
+        try:
+            while self.sock.recv(8192):
+                pass
+        except socket.error:
+            pass
+
+    def recv_remaining(self, response, timeout=.2):
+        """
+        append the data of the following packets of a response the server has split into several packets
+        """
+        response_type, response_data = response
+        chunks = [response_data]
+        while 1:
+            try:
+                packet_type, packet_data = self.parse_packet(self.recv(timeout))
+            except Exception:
+                break
+            if packet_type != response_type:
+                break
+            chunks.append(packet_data)
+        return response_type, ''.join(chunks)
+
+    def rcon(self, cmd, multipacket=False):
         """
         send RCON command
         """
-        r_cmd = self.command('rcon "%s" %s' % (self.rcon_password, cmd))
+        r_cmd = self.command('rcon "%s" %s' % (self.rcon_password, cmd), multipacket=multipacket)
         if r_cmd[1] == 'No rconpassword set on the server.\n' or r_cmd[1] == 'Bad rconpassword.\n':
             raise Exception(r_cmd[1][:-1])
         return r_cmd
@@ -152,507 +563,2178 @@ class PyQuake3(object):
         response_data = data[first_line_length + 1:]
         return response_type, response_data
 
-    def parse_status(self, data):
+    def parse_status(self, data):
+        """
+        parse the response message and return a list
+        """
+        # the server info is the first line, the list of players follows
+        info, newline, players = data[1:].partition('\n')
+        split = info.split('\\')
+        values = dict(zip(split[::2], split[1::2]))
+        if newline:
+            self.parse_players(players)
+        return values
+
+    def parse_players(self, data):
+        """
+        parse player information - name, frags and ping
+        """
+        self.players = [Q3Player(1, name, frags, ping) for frags, ping, name in self.player_reo.findall(data)]
+
+    def update(self):
+        """
+        get status
+        """
+        data = self.command('getstatus')[1]
+        self.values = self.parse_status(data)
+
+    def rcon_update(self):
+        """
+        perform RCON status update
+        """
+        self.parse_rcon_status(self.rcon('status')[1])
+
+    def rcon_dumpuser(self, num):
+        """
+        return the userinfo of a player as dictionary
+        """
+        return self.parse_dumpuser(self.rcon('dumpuser %d' % num)[1])
+
+    def parse_dumpuser(self, data):
+        """
+        parse the output of the RCON dumpuser command, an empty dictionary for unknown players
+        """
+        values = {}
+        # skip the 'userinfo' and '--------' header lines
+        for line in data.split('\n')[2:]:
+            split = line.split(None, 1)
+            if len(split) == 2:
+                values[split[0]] = split[1].rstrip()
+        return values
+
+    def parse_rcon_status(self, data):
+        """
+        parse the output of the RCON status command
+        """
+        # the header lines do not match, players without a numeric ping get the ping -1
+        self.players = [Q3Player(int(num), name, int(score), int(ping) if ping.isdigit() else -1, address) for num, score, ping, name, address in self.status_reo.findall(data)]
+        return self.players
+
+
+### CLASS Event Loop ###
+class EventLoop(object):
+    """
+    select() based event loop for sockets, file descriptors and timers
+    """
+    def __init__(self):
+        """
+        create a new instance of EventLoop
+        """
+        self.readers = {}
+        # heap of [time, sequence, callback, args] entries, cancelled entries have no callback
+        self.timers = []
+        self.timer_seq = 0
+        self.ready = deque()
+        self.threadsafe_calls = deque()
+        self.threadsafe_lock = RLock()
+        self.running = False
+        # self-pipe to wake up select() when another thread schedules a call
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        for fd in (self.wakeup_read, self.wakeup_write):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self.add_reader(self.wakeup_read, self.drain_wakeup)
+
+    def add_reader(self, fd, callback):
+        """
+        call callback whenever the file descriptor is readable
+        """
+        self.readers[fd] = callback
+
+    def remove_reader(self, fd):
+        """
+        stop watching the file descriptor
+        """
+        self.readers.pop(fd, None)
+
+    def call_soon(self, callback, *args):
+        """
+        call callback in the next iteration, not thread-safe
+        """
+        self.ready.append((callback, args))
+
+    def call_soon_threadsafe(self, callback, *args):
+        """
+        call callback in the next iteration, may be used from any thread
+        """
+        with self.threadsafe_lock:
+            self.threadsafe_calls.append((callback, args))
+        try:
+            os.write(self.wakeup_write, 'x')
+        except OSError, err:
+            if err.errno != errno.EAGAIN:
+                raise
+
+    def call_later(self, delay, callback, *args):
+        """
+        call callback after delay seconds, return a handle for cancel_timer
+        """
+        self.timer_seq += 1
+        timer = [time.time() + delay, self.timer_seq, callback, args]
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def cancel_timer(self, timer):
+        """
+        cancel a timer created by call_later
+        """
+        timer[2] = None
+
+    def drain_wakeup(self):
+        """
+        empty the self-pipe
+        """
+        try:
+            while os.read(self.wakeup_read, 4096):
+                pass
+        except OSError, err:
+            if err.errno != errno.EAGAIN:
+                raise
+
+    def run_once(self):
+        """
+        wait for the next event and run all callbacks which are due
+        """
+        with self.threadsafe_lock:
+            self.ready.extend(self.threadsafe_calls)
+            self.threadsafe_calls.clear()
+        if self.ready:
+            timeout = 0
+        elif self.timers:
+            timeout = max(self.timers[0][0] - time.time(), 0)
+        else:
+            timeout = None
+        try:
+            readable = select.select(list(self.readers), [], [], timeout)[0]
+        except select.error, err:
+            if err[0] != errno.EINTR:
+                raise
+            readable = []
+        for fd in readable:
+            if fd in self.readers:
+                self.ready.append((self.readers[fd], ()))
+        now = time.time()
+        while self.timers and self.timers[0][0] <= now:
+            timer = heapq.heappop(self.timers)
+            if timer[2]:
+                self.ready.append((timer[2], timer[3]))
+        ready = self.ready
+        self.ready = deque()
+        for callback, args in ready:
+            try:
+                callback(*args)
+            except Exception, err:
+                print "%s: %s" % (err.__class__.__name__, err)
+
+    def run_forever(self):
+        """
+        run the event loop until stop is called
+        """
+        self.running = True
+        while self.running:
+            self.run_once()
+
+    def stop(self):
+        """
+        stop the event loop, may be used from any thread
+        """
+        self.call_soon_threadsafe(setattr, self, 'running', False)
+
+
+### CLASS Async PyQuake3 ###
+class RconRequest(object):
+    """
+    request of AsyncQuake3 waiting for its response
+    """
+    def __init__(self, cmd, callback, response_type, timeout, retries):
+        """
+        create a new instance of RconRequest
+        """
+        self.cmd = cmd
+        self.callback = callback
+        self.response_type = response_type
+        self.timeout = timeout
+        self.retries = retries
+        self.sent = 0
+        self.timer = None
+
+
+class AsyncQuake3(PyQuake3):
+    """
+    non-blocking PyQuake3 driven by an EventLoop
+
+    Responses are delivered to callbacks as (response, None) or (None, error). As
+    the Quake 3 protocol has no request ids and all RCON responses are 'print'
+    packets, only one request is in flight, the others wait in order. The event
+    loop keeps running while a request waits for its response or its retry.
+    """
+    def __init__(self, server, rcon_password, loop, timeout=.25, retries=5, backoff=2):
+        """
+        create a new instance of AsyncQuake3
+
+        @param server: The server address "address:port"
+        @type  server: String
+        @param rcon_password: The RCON password
+        @type  rcon_password: String
+        @param loop: The event loop
+        @type  loop: Instance
+        @param timeout: The timeout of the first attempt in seconds
+        @type  timeout: Float
+        @param retries: The number of attempts per request
+        @type  retries: Integer
+        @param backoff: The factor the timeout is multiplied with after each attempt
+        @type  backoff: Float
+        """
+        PyQuake3.__init__(self, server, rcon_password)
+        self.sock.setblocking(0)
+        self.loop = loop
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        # waiting requests, the request in flight and the timer delaying the next request after a retry
+        self.requests = deque()
+        self.in_flight = None
+        self.resume_timer = None
+        # statistics
+        self.retransmits = 0
+        self.timeouts = 0
+        self.discarded = 0
+        loop.add_reader(self.sock.fileno(), self.on_readable)
+
+    def command(self, cmd, callback=None, response_type=None):
+        """
+        queue command, the callback gets the parsed packet
+        """
+        request = RconRequest(cmd, callback, response_type, self.timeout, self.retries)
+        self.requests.append(request)
+        if not self.in_flight and not self.resume_timer:
+            self.send_next()
+        return request
+
+    def send_next(self):
+        """
+        send the oldest waiting request
+        """
+        self.resume_timer = None
+        if self.requests:
+            self.in_flight = self.requests.popleft()
+            self.send_request(self.in_flight)
+
+    def finish(self, request, response, error):
+        """
+        complete the request in flight and go on with the next one
+        """
+        self.in_flight = None
+        if request.retries < self.retries:
+            # a late response to an earlier attempt may still arrive, it must not complete the next request
+            self.resume_timer = self.loop.call_later(self.timeout, self.send_next)
+        else:
+            self.send_next()
+        if request.callback:
+            request.callback(response, error)
+
+    def send_request(self, request):
+        """
+        send the packet of a request and start its timer
+        """
+        request.sent = time.time()
+        try:
+            self.send_packet(request.cmd)
+        except socket.error:
+            # handled like a lost packet
+            pass
+        request.timer = self.loop.call_later(request.timeout, self.on_timeout, request)
+
+    def on_timeout(self, request):
+        """
+        resend the request with a longer timeout or give up
+        """
+        if request is not self.in_flight:
+            return
+        request.retries -= 1
+        if request.retries > 0:
+            self.retransmits += 1
+            metrics.inc('pcwbot_rcon_retries_total', self.metric_labels)
+            request.timeout *= self.backoff
+            self.send_request(request)
+        else:
+            self.timeouts += 1
+            metrics.inc('pcwbot_rcon_timeouts_total', self.metric_labels)
+            self.finish(request, None, Exception('Server response timed out'))
+
+    def on_readable(self):
+        """
+        read all received packets and complete the request in flight, late responses are discarded
+        """
+        while 1:
+            try:
+                data = self.sock.recv(8192)
+            except socket.error, err:
+                if err.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ECONNREFUSED):
+                    print "- RCON socket error: %s" % err
+                return
+            try:
+                response = self.parse_packet(data)
+            except Exception:
+                continue
+            request = self.in_flight
+            if not request or (request.response_type is not None and request.response_type != response[0]):
+                self.discarded += 1
+                continue
+            self.loop.cancel_timer(request.timer)
+            metrics.observe('pcwbot_rcon_rtt_seconds', time.time() - request.sent, self.metric_labels)
+            self.finish(request, response, None)
+
+    def rcon(self, cmd, callback=None):
+        """
+        send RCON command
+        """
+        def check_password(response, error):
+            if not error and response[1] in ('No rconpassword set on the server.\n', 'Bad rconpassword.\n'):
+                response, error = None, Exception(response[1][:-1])
+            if callback:
+                callback(response, error)
+        return self.command('rcon "%s" %s' % (self.rcon_password, cmd), check_password, 'print')
+
+    def update(self, callback=None):
+        """
+        get status
+        """
+        def set_values(response, error):
+            if not error:
+                self.values = self.parse_status(response[1])
+            if callback:
+                callback(self.values if not error else None, error)
+        return self.command('getstatus', set_values, 'statusResponse')
+
+    def rcon_update(self, callback=None):
+        """
+        perform RCON status update
+        """
+        def set_players(response, error):
+            if not error:
+                self.parse_rcon_status(response[1])
+            if callback:
+                callback(self.players if not error else None, error)
+        return self.rcon('status', set_players)
+
+    def rcon_dumpuser(self, num, callback=None):
+        """
+        get the userinfo of a player, the callback gets the userinfo dictionary
+        """
+        def set_userinfo(response, error):
+            if callback:
+                callback(self.parse_dumpuser(response[1]) if not error else None, error)
+        return self.rcon('dumpuser %d' % num, set_userinfo)
+
+
+### CLASS Rcon ###
+class Rcon(object):
+    """
+    RCON class, version 1.0.7
+    """
+    # commands whose pending value is replaced by a newer one, the key is the command without its last argument
+    superseding = ('g_nextmap', 'g_password', 'forceteam')
+    # commands which are not idempotent and must never be deduplicated
+    repeatable = ('swapteams', 'cyclemap')
+
+    def __init__(self, host, port, passwd, rate=10, burst=10, merge_tell=0, loop=None):
+        """
+        create a new instance of Rcon
+
+        @param host: The server IP address
+        @type  host: String
+        @param port: The server port
+        @type  port: String
+        @param passwd: The RCON password
+        @type  passwd: String
+        @param rate: The maximum number of RCON commands per second, 0 = unlimited
+        @type  rate: Float
+        @param burst: The number of RCON commands which may be sent at once
+        @type  burst: Integer
+        @param merge_tell: The maximum length of merged tell messages for the same player, 0 = do not merge
+        @type  merge_tell: Integer
+        @param loop: The event loop to send the queued commands with instead of a thread
+        @type  loop: Instance
+        """
+        self.live = False
+        self.quake = PyQuake3("%s:%s" % (host, port), passwd)
+        self.loop = loop
+        self.async_quake = AsyncQuake3("%s:%s" % (host, port), passwd, loop) if loop else None
+        self.flush_timer = None
+        self.rcon_lock = RLock()
+        # pending commands as [queued, command, key, callback, sequence number] entries, indexed by command and by superseding key
+        self.queue = deque()
+        self.queue_cond = Condition()
+        self.pending_commands = {}
+        self.pending_keys = {}
+        # sequence number of the last queued entry and of the last queued repeatable command, entries queued
+        # before a repeatable command are not coalesced any more, that would change the effect of the command
+        self.sequence = 0
+        self.barrier = 0
+        self.merge_tell = merge_tell
+        # token bucket matching the flood protection of the server
+        self.rate = float(rate)
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.token_time = time.time()
+        self.token_lock = Lock()
+        # statistics
+        self.sent = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.deduplicated = 0
+        self.superseded = 0
+        self.merged = 0
+        self.metric_labels = (('server', "%s:%s" % (host, port)),)
+        self.result_labels = {False: self.metric_labels + (('result', 'sent'),), True: self.metric_labels + (('result', 'failed'),)}
+        metrics.add_collector(self.collect_metrics)
+        if not loop:
+            # start Thread
+            self.processor = Thread(target=self.process, name='rcon %s:%s' % (host, port))
+            self.processor.setDaemon(True)
+            self.processor.start()
+
+    def push(self, msg):
+        """
+        execute RCON command
+
+        @param msg: The RCON command
+        @type  msg: String
+        """
+        if self.live:
+            with self.queue_cond:
+                if not self.coalesce(msg):
+                    cmd = msg.split(' ', 1)[0]
+                    key = msg.rsplit(' ', 1)[0] if cmd in self.superseding else None
+                    self.sequence += 1
+                    entry = [time.time(), msg, key, None, self.sequence]
+                    self.queue.append(entry)
+                    if cmd in self.repeatable:
+                        self.barrier = self.sequence
+                    if cmd not in self.repeatable:
+                        self.pending_commands[msg] = entry
+                    if key:
+                        self.pending_keys[key] = entry
+                    if self.loop:
+                        self.loop.call_soon_threadsafe(self.flush)
+                    else:
+                        self.queue_cond.notify()
+
+    def request(self, msg, callback):
+        """
+        queue an RCON command whose response is needed, it is sent in order with the other commands and rate limited
+
+        @param msg: The RCON command
+        @type  msg: String
+        @param callback: The callable which gets the response text or None and the error
+        @type  callback: Callable
+        """
+        if not self.live:
+            callback(None, Exception('RCON is not live'))
+            return
+        with self.queue_cond:
+            # never coalesced, every request gets its own response
+            self.sequence += 1
+            self.queue.append([time.time(), msg, None, callback, self.sequence])
+            if self.loop:
+                self.loop.call_soon_threadsafe(self.flush)
+            else:
+                self.queue_cond.notify()
+
+    def coalesce(self, msg):
+        """
+        merge the command into a pending command if possible, return True if it has been merged
+
+        @param msg: The RCON command
+        @type  msg: String
+        """
+        entry = self.pending_commands.get(msg)
+        if entry and entry[4] > self.barrier:
+            self.deduplicated += 1
+            return True
+        cmd = msg.split(' ', 1)[0]
+        if cmd in self.superseding:
+            # e.g. 'g_nextmap A; cyclemap; g_nextmap B' must load A, B is queued after cyclemap then
+            entry = self.pending_keys.get(msg.rsplit(' ', 1)[0])
+            if entry and entry[4] > self.barrier:
+                self.replace_pending(entry, msg)
+                self.superseded += 1
+                return True
+        elif cmd == 'tell' and self.merge_tell and self.queue:
+            entry = self.queue[-1]
+            if entry[1].startswith('tell '):
+                target, text = msg[5:].split(' ', 1)
+                last_target, last_text = entry[1][5:].split(' ', 1)
+                if target == last_target and len(last_text) + len(text) < self.merge_tell:
+                    self.replace_pending(entry, 'tell %s %s %s' % (target, last_text, text))
+                    self.merged += 1
+                    return True
+        return False
+
+    def replace_pending(self, entry, msg):
+        """
+        replace the command of a pending entry
+        """
+        if self.pending_commands.get(entry[1]) is entry:
+            del self.pending_commands[entry[1]]
+        entry[1] = msg
+        self.pending_commands[msg] = entry
+
+    def go_live(self):
+        """
+        go live
+        """
+        self.live = True
+
+    def get_rcon_output(self, value, multipacket=False):
+        """
+        get RCON output for value
+
+        @param value: The RCON command
+        @type  value: String
+        @param multipacket: Collect all packets of a long response
+        @type  multipacket: Boolean
+        """
+        if self.live:
+            start = time.time()
+            with self.rcon_lock:
+                self.throttle()
+                try:
+                    return self.quake.rcon(value, multipacket)
+                finally:
+                    slow_log.check('rcon', time.time() - start, value)
+
+    def get_status(self):
+        """
+        return the players of the RCON status command
+        """
+        if self.live:
+            with self.rcon_lock:
+                self.throttle()
+                self.quake.rcon_update()
+                return self.quake.players
+
+    def get_userinfo(self, num):
+        """
+        return the userinfo of a player as dictionary
+
+        @param num: The player number
+        @type  num: Integer
+        """
+        if self.live:
+            with self.rcon_lock:
+                self.throttle()
+                return self.quake.rcon_dumpuser(num)
+
+    def take_token(self):
+        """
+        take a token from the token bucket, return 0 or the seconds to wait for the next token
+        """
+        if self.rate <= 0:
+            return 0
+        # the send queue and the RCON queries of other threads share the bucket
+        with self.token_lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.token_time) * self.rate)
+            self.token_time = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+            return 0
+
+    def throttle(self):
+        """
+        wait until the token bucket allows to send the next command
+        """
+        delay = self.take_token()
+        while delay:
+            time.sleep(delay)
+            delay = self.take_token()
+
+    def pop_pending(self):
+        """
+        remove the oldest pending entry from the queue, the queue condition must be held
+        """
+        entry = self.queue.popleft()
+        queued, command, key, callback = entry[:4]
+        if self.pending_commands.get(command) is entry:
+            del self.pending_commands[command]
+        if key and self.pending_keys.get(key) is entry:
+            del self.pending_keys[key]
+        return queued, command, callback
+
+    def command_done(self, queued, error):
+        """
+        update the statistics of a sent command
+        """
+        if error:
+            self.failed += 1
+        else:
+            self.sent += 1
+        latency = time.time() - queued
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        metrics.observe('pcwbot_rcon_queue_latency_seconds', latency, self.metric_labels)
+        metrics.inc('pcwbot_rcon_commands_total', self.result_labels[bool(error)])
+
+    def collect_metrics(self):
+        """
+        return the current queue depth for the metrics endpoint
+        """
+        return [('pcwbot_rcon_queue_depth', self.metric_labels, len(self.queue))]
+
+    def flush(self):
+        """
+        send the queued commands on the event loop as far as the rate limit allows
+        """
+        while 1:
+            with self.queue_cond:
+                if not self.queue:
+                    return
+                delay = self.take_token()
+                if delay:
+                    if not self.flush_timer:
+                        self.flush_timer = self.loop.call_later(delay, self.flush_due)
+                    return
+                queued, command, callback = self.pop_pending()
+
+            def done(response, error, queued=queued, command=command, callback=callback, start=time.time()):
+                slow_log.check('rcon', time.time() - start, command)
+                self.command_done(queued, error)
+                if callback:
+                    callback(response[1] if response else None, error)
+            if command != 'status' or callback:
+                self.async_quake.rcon(command, done)
+            else:
+                self.async_quake.rcon_update(done)
+
+    def flush_due(self):
+        """
+        timer callback of flush, a fired timer keeps its callback and must not block the next retry
+        """
+        self.flush_timer = None
+        self.flush()
+
+    def get_stats(self):
+        """
+        return the queue depth, the number of sent, failed and saved commands and the latency from push to send in seconds
+        """
+        done = self.sent + self.failed
+        return {'queue_depth': len(self.queue), 'sent': self.sent, 'failed': self.failed,
+                'latency_avg': self.latency_total / done if done else 0.0, 'latency_max': self.latency_max,
+                'deduplicated': self.deduplicated, 'superseded': self.superseded, 'merged': self.merged,
+                'packets_saved': self.deduplicated + self.superseded + self.merged}
+
+    def process(self):
+        """
+        Thread process, send the queued commands as soon as the rate limit allows
+        """
+        while 1:
+            with self.queue_cond:
+                while not self.queue:
+                    self.queue_cond.wait()
+                queued, command, callback = self.pop_pending()
+            self.throttle()
+            response = None
+            error = None
+            start = time.time()
+            with self.rcon_lock:
+                try:
+                    if command != 'status' or callback:
+                        response = self.quake.rcon(command)
+                    else:
+                        self.quake.rcon_update()
+                except Exception, err:
+                    error = err
+            slow_log.check('rcon', time.time() - start, command)
+            self.command_done(queued, error)
+            if callback:
+                callback(response[1] if response else None, error)
+
+
+class NullRcon(object):
+    """
+    stand-in for Rcon which counts the commands instead of sending them, used for offline replays
+    """
+    def __init__(self):
+        """
+        create a new instance of NullRcon
+        """
+        self.live = False
+        self.commands = {}
+
+    def go_live(self):
+        """
+        go live
+        """
+        self.live = True
+
+    def push(self, msg):
+        """
+        count the RCON command
+        """
+        cmd = msg.split(' ', 1)[0]
+        self.commands[cmd] = self.commands.get(cmd, 0) + 1
+
+    def get_rcon_output(self, value, multipacket=False):
+        """
+        return an empty response
+        """
+        return 'print', ''
+
+
+### CLASS Log Tail ###
+class PollingTail(object):
+    """
+    follow the games log file by polling, works on every platform
+    """
+    # the game time in front of an action, it is wider than 7 characters from 1000:00 on
+    time_reo = re.compile(r' *\d+:\d\d $')
+
+    def __init__(self, path, interval=.125, chunk_size=65536):
+        """
+        create a new instance of PollingTail
+
+        @param path: The full path of the games log file
+        @type  path: String
+        @param interval: The sleep time in seconds when the end of file is reached
+        @type  interval: Float
+        @param chunk_size: The number of bytes read from the games log file at once
+        @type  chunk_size: Integer
+        """
+        self.path = path
+        self.interval = interval
+        self.log_file = None
+        self.inode = None
+        # reusable read buffer and the incomplete last line of the previous read
+        self.chunk = bytearray(chunk_size)
+        self.pending = bytearray()
+        self.open_log(seek_end=True)
+
+    def open_log(self, seek_end=False):
+        """
+        (re)open the games log file
+        """
+        if self.log_file:
+            self.log_file.close()
+        self.log_file = open(self.path, 'r')
+        if seek_end:
+            # go to the end of the file
+            self.log_file.seek(0, 2)
+        self.inode = os.fstat(self.log_file.fileno()).st_ino
+        del self.pending[:]
+
+    def seek_last(self, action, block_size=1048576):
+        """
+        go to the last line of the given log action, the file is scanned backward from the end in blocks
+
+        @param action: The log action, e.g. 'InitGame'
+        @type  action: String
+        @param block_size: The number of bytes read at once
+        @type  block_size: Integer
+
+        @return: The position of the line or None if the action has not been found and the position is unchanged
+        """
+        marker = '%s:' % action
+        end = self.log_file.tell()
+        pos = end
+        # the start of the previous block, an action may span both blocks
+        carry = ''
+        while pos > 0:
+            start = max(0, pos - block_size)
+            self.log_file.seek(start)
+            block = self.log_file.read(pos - start) + carry
+            found = block.rfind(marker)
+            while found != -1:
+                # the action follows the game time at the start of a line
+                line_start = block.rfind('\n', 0, found) + 1
+                if (line_start > 0 or start == 0) and self.time_reo.match(block, line_start, found):
+                    self.log_file.seek(start + line_start)
+                    del self.pending[:]
+                    return start + line_start
+                found = block.rfind(marker, 0, found)
+            # the game time is at most a few characters wider than 7
+            carry = block[:len(marker) + 16]
+            pos = start
+        self.log_file.seek(end)
+        return None
+
+    def check_rotated(self):
+        """
+        reopen the games log file if it has been truncated or replaced, return True if so
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            # file is missing while it gets rotated, keep the old handle until it is back
+            return False
+        if stat.st_ino != self.inode:
+            self.open_log()
+            return True
+        if stat.st_size < self.log_file.tell():
+            self.log_file.seek(0)
+            del self.pending[:]
+            return True
+        return False
+
+    def read_lines(self):
+        """
+        return a list of all complete lines of the next chunk, an empty list if there is none yet
+        """
+        size = self.log_file.readinto(self.chunk)
+        if not size and self.check_rotated():
+            size = self.log_file.readinto(self.chunk)
+        if not size:
+            return []
+        pending = self.pending
+        pending.extend(buffer(self.chunk, 0, size))
+        end = pending.rfind('\n')
+        if end == -1:
+            if len(pending) > len(self.chunk):
+                # drop a garbage line which is longer than a whole chunk
+                del pending[:]
+            return []
+        lines = str(pending[:end]).split('\n')
+        # keep the incomplete line until the rest has been written
+        del pending[:end + 1]
+        return lines
+
+    def wait(self):
+        """
+        wait for new data
+        """
+        time.sleep(self.interval)
+
+    def fileno(self):
+        """
+        return the file descriptor an event loop can wait for, None if the file must be polled
+        """
+        return None
+
+    def close(self):
+        """
+        close the games log file
+        """
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+
+class InotifyTail(PollingTail):
+    """
+    follow the games log file using inotify, Linux only
+    """
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0x00000800
+    IN_CLOEXEC = 0x00080000
+    event_header = struct.Struct('iIII')
+
+    def __init__(self, path, interval=5, chunk_size=65536):
+        """
+        create a new instance of InotifyTail
+
+        @param path: The full path of the games log file
+        @type  path: String
+        @param interval: The maximum time in seconds to wait for an event before the file is checked anyway
+        @type  interval: Float
+        @param chunk_size: The number of bytes read from the games log file at once
+        @type  chunk_size: Integer
+        """
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.inotify_fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.inotify_fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, 'inotify_init1: %s' % os.strerror(err))
+        # watch the directory instead of the file itself to follow the log file through rotation
+        directory, self.filename = os.path.split(os.path.abspath(path))
+        mask = self.IN_MODIFY | self.IN_ATTRIB | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+        if libc.inotify_add_watch(self.inotify_fd, directory, mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.inotify_fd)
+            raise OSError(err, 'inotify_add_watch: %s' % os.strerror(err))
+        PollingTail.__init__(self, path, interval, chunk_size)
+
+    def read_events(self):
+        """
+        read all pending inotify events, return True if one of them refers to the games log file
+        """
+        found = False
+        while 1:
+            try:
+                data = os.read(self.inotify_fd, 4096)
+            except OSError, err:
+                if err.errno in (errno.EAGAIN, errno.EINTR):
+                    return found
+                raise
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = self.event_header.unpack_from(data, offset)
+                offset += self.event_header.size
+                if data[offset:offset + length].rstrip('\0') == self.filename:
+                    found = True
+                offset += length
+
+    def wait(self):
+        """
+        block until the games log file has been changed or the interval is over
+        """
+        end = time.time() + self.interval
+        timeout = self.interval
+        while timeout > 0:
+            try:
+                readable = select.select([self.inotify_fd], [], [], timeout)[0]
+            except select.error, err:
+                if err[0] != errno.EINTR:
+                    raise
+                readable = None
+            if readable and self.read_events():
+                return
+            timeout = end - time.time()
+
+    def fileno(self):
+        """
+        return the inotify file descriptor, readable when read_events has to be called
+        """
+        return self.inotify_fd
+
+    def close(self):
+        """
+        close the games log file and the inotify instance
+        """
+        PollingTail.close(self)
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+
+def create_log_tail(path, backend='auto'):
+    """
+    return the best available tail backend for the games log file
+
+    @param path: The full path of the games log file
+    @type  path: String
+    @param backend: The tail backend: auto, inotify or poll
+    @type  backend: String
+    """
+    if backend in ('auto', 'inotify') and sys.platform.startswith('linux'):
+        try:
+            return InotifyTail(path)
+        except (OSError, AttributeError), err:
+            print "- inotify not available (%s), falling back to polling." % err
+    return PollingTail(path)
+
+
+### CLASS Substring Index ###
+class SubstringIndex(object):
+    """
+    immutable index over a list of lowercase names for prefix and substring search
+    """
+    def __init__(self, names):
+        """
+        create a new instance of SubstringIndex
+
+        @param names: The lowercase names
+        @type  names: Iterable
+        """
+        self.names = sorted(names)
+        # all names joined by newlines and their start offsets, one find() call scans all names
+        self.haystack = "\n".join(self.names)
+        self.offsets = []
+        offset = 0
+        for name in self.names:
+            self.offsets.append(offset)
+            offset += len(name) + 1
+
+    def startswith(self, prefix):
+        """
+        return the sorted list of names starting with the given prefix
+        """
+        names = self.names
+        idx = bisect.bisect_left(names, prefix)
+        end = idx
+        while end < len(names) and names[end].startswith(prefix):
+            end += 1
+        return names[idx:end]
+
+    def contains(self, key):
+        """
+        return the sorted list of names containing the given key
+        """
+        if not key:
+            return list(self.names)
+        matches = []
+        pos = self.haystack.find(key)
+        while pos != -1:
+            idx = bisect.bisect_right(self.offsets, pos) - 1
+            matches.append(self.names[idx])
+            # continue the search with the next name
+            if idx + 1 == len(self.offsets):
+                break
+            pos = self.haystack.find(key, self.offsets[idx + 1])
+        return matches
+
+
+### CLASS Map Catalog ###
+class MapCatalog(object):
+    """
+    catalog of all available maps
+    """
+    def __init__(self, maps=()):
+        """
+        create a new instance of MapCatalog
+
+        @param maps: The map names
+        @type  maps: Iterable
+        """
+        # lowercase map name -> map name as reported by the server
+        self.maps = dict([(name.lower(), name) for name in maps])
+        self.index = SubstringIndex(self.maps)
+
+    def __len__(self):
+        return len(self.maps)
+
+    def get_maps(self):
+        """
+        return the sorted list of all map names
+        """
+        return [self.maps[key] for key in self.index.names]
+
+    def find(self, map_name):
+        """
+        return the list of maps matching the given name, an exact match is returned alone
+
+        @param map_name: The full or partial map name, with or without 'ut4_' prefix
+        @type  map_name: String
+        """
+        key = map_name.lower()
+        for name in (key, 'ut4_%s' % key):
+            if name in self.maps:
+                return [self.maps[name]]
+        # auto-complete the beginning of the name before searching within the names
+        matches = self.index.startswith(key) or self.index.startswith('ut4_%s' % key) or self.index.contains(key)
+        return [self.maps[name] for name in matches]
+
+
+### CLASS Command ###
+class Command(object):
+    """
+    chat command of the bot
+    """
+    def __init__(self, name, handler, role=40, usage=None, nargs=0, aliases=(), hidden=False):
+        """
+        create a new instance of Command
+
+        @param name: The command name without leading '!'
+        @type  name: String
+        @param handler: The callable which gets the calling player and the list of arguments
+        @type  handler: Callable
+        @param role: The minimum admin role required to use the command
+        @type  role: Integer
+        @param usage: The usage text shown when arguments are missing
+        @type  usage: String
+        @param nargs: The number of required arguments, a single argument gets the whole rest of the line
+        @type  nargs: Integer
+        @param aliases: The short names of the command without leading '!'
+        @type  aliases: List
+        @param hidden: Hide the command from the !help output and the privilege message
+        @type  hidden: Boolean
+        """
+        self.name = name
+        self.handler = handler
+        self.role = role
+        self.usage = usage
+        self.nargs = nargs
+        self.aliases = aliases
+        self.hidden = hidden
+
+    def parse_args(self, arg):
+        """
+        return the list of arguments or None if required arguments are missing
+
+        @param arg: The text following the command
+        @type  arg: String
+        """
+        if self.nargs > 1:
+            args = arg.split()
+        else:
+            args = [arg] if arg else []
+        return args if len(args) >= self.nargs else None
+
+
+### CLASS Command Pool ###
+class CommandPool(object):
+    """
+    worker threads running the chat commands off the log reading thread
+    """
+    def __init__(self, workers, name):
+        """
+        create a new instance of CommandPool and start the worker threads
+
+        @param workers: The number of worker threads
+        @type  workers: Integer
+        @param name: The name of the game server, used for the thread names
+        @type  name: String
+        """
+        # one queue per worker, the commands of a player slot always go to the same worker and run in order
+        self.queues = []
+        for num in xrange(max(workers, 1)):
+            jobs = Queue()
+            worker = Thread(target=self.process, args=(jobs,), name='commands %s #%d' % (name, num))
+            worker.setDaemon(True)
+            worker.start()
+            self.queues.append(jobs)
+
+    def submit(self, slot, func, *args):
+        """
+        queue a call for the worker of the player slot, returns immediately
+
+        @param slot: The player number
+        @type  slot: Integer
+        """
+        self.queues[slot % len(self.queues)].put((func, args))
+
+    def depth(self):
+        """
+        return the number of queued calls
+        """
+        return sum([jobs.qsize() for jobs in self.queues])
+
+    def process(self, jobs):
+        """
+        Thread process, run the queued calls
+        """
+        while 1:
+            func, args = jobs.get()
+            func(*args)
+
+
+### CLASS Log Parser ###
+class LogParser(object):
+    """
+    log file parser
+    """
+    team_dict = {'red': 'red', 'r': 'red', 're': 'red',
+                 'blue': 'blue', 'b': 'blue', 'bl': 'blue', 'blu': 'blue',
+                 'spec': 'spectator', 'spectator': 'spectator', 's': 'spectator', 'sp': 'spectator', 'spe': 'spectator',
+                 'green': 'green'}
+    # serializes the commands changing admin roles, they run on the command workers of all servers
+    admin_lock = TimedLock('admin_lock', Lock())
+
+    def __init__(self, config_file, section='server', log_file=None):
+        """
+        create a new instance of LogParser
+
+        @param config_file: The full path of the bot configuration file
+        @type  config_file: String
+        @param section: The configuration section of the game server
+        @type  section: String
+        @param log_file: The full path of a games log file to replay offline instead of the log_file of the section
+        @type  log_file: String
+        """
+        # chat commands, the !help output and the privilege check are generated from this registry
+        self.commands = {}
+        # admin role -> !help message
+        self.help_messages = {}
+        self.register_command(Command('help', self.cmd_help, 40, aliases=['h'], hidden=True))
+        ## admin level 40
+        self.register_command(Command('cyclemap', self.cmd_cyclemap, 40))
+        self.register_command(Command('exec', self.cmd_exec, 40, "^7Usage: !exec <filename>", 1))
+        self.register_command(Command('force', self.cmd_force, 40, "^7Usage: !force <name> <blue/red/spec>", 2))
+        self.register_command(Command('kick', self.cmd_kick, 40, "^7Usage: !kick <name>", 1, aliases=['k']))
+        self.register_command(Command('list', self.cmd_list, 40))
+        self.register_command(Command('map', self.cmd_map, 40, "^7Usage: !map <ut4_name>", 1))
+        self.register_command(Command('password', self.cmd_password, 40))
+        self.register_command(Command('reload', self.cmd_reload, 40))
+        self.register_command(Command('setnextmap', self.cmd_setnextmap, 40, "^7Usage: !setnextmap <ut4_name>", 1))
+        self.register_command(Command('swapteams', self.cmd_swapteams, 80))
+        self.register_command(Command('veto', self.cmd_veto, 40))
+        ## head admin level 100
+        self.register_command(Command('leveltest', self.cmd_leveltest, 100, aliases=['lt']))
+        self.register_command(Command('putgroup', self.cmd_putgroup, 100, "^7Usage: !putgroup <name> <group>", 2))
+        self.register_command(Command('ungroup', self.cmd_ungroup, 100, "^7Usage: !ungroup <name>", 1))
+        ## iamgod
+        self.register_command(Command('iamgod', self.cmd_iamgod, 0, hidden=True))
+
+        self.config_file = config_file
+        self.section = section
+        config = ConfigParser.ConfigParser()
+        config.read(config_file)
+        print "- Imported config file '%s' successful." % config_file
+
+        games_log = log_file or config.get(section, 'log_file')
+        tail_backend = config.get('bot', 'tail_backend') if config.has_option('bot', 'tail_backend') else 'auto'
+        self.use_event_loop = config.getboolean('bot', 'event_loop') if config.has_option('bot', 'event_loop') else False
+        # an offline replay handles the whole given file, its commands included
+        warm_start = config.getboolean('bot', 'warm_start') if config.has_option('bot', 'warm_start') and not log_file else False
+        # interval of the player reconciliation with the RCON status, doubled up to the maximum while nothing changes
+        self.player_poll_min = config.getfloat('bot', 'player_poll') if config.has_option('bot', 'player_poll') else 5
+        self.player_poll_max = config.getfloat('bot', 'player_poll_max') if config.has_option('bot', 'player_poll_max') else 60
+        # threads running the chat commands, 0 = run them on the log reading thread
+        self.command_workers = config.getint('bot', 'command_workers') if config.has_option('bot', 'command_workers') else 2
+        # open game log file and go to the end of the file
+        self.log_tail = create_log_tail(games_log, tail_backend)
+        print "- Parsing games log file '%s' successful (%s)." % (games_log, self.log_tail.__class__.__name__)
+        # replay the log since the current map has been started to learn the connected players
+        self.replaying = False
+        if warm_start:
+            end = self.log_tail.log_file.tell()
+            start = self.log_tail.seek_last('InitGame')
+            if start is not None:
+                self.replaying = True
+                print "- Replaying the last %d bytes of the games log since the map start." % (end - start)
+
+        self.game = None
+        self.loop = None
+        self.poll_timer = None
+        self.players_lock = TimedLock('players_lock %s' % section)
+        self.command_pool = None
+        # last userinfo string of each slot, unchanged userinfo is skipped
+        self.userinfo = {}
+        self.player_poll_delay = self.player_poll_min
+        # the timer of the next poll or the watchdog of the running poll, and the number of the running poll
+        self.player_poll_timer = None
+        self.player_poll_id = 0
+        # players missing in the last RCON status
+        self.missing_slots = set()
+
+        # time the current batch of lines has been read, for the command latency
+        self.batch_time = time.time()
+        # per line counters are kept here under the players lock, not in the locked metrics registry
+        self.line_count = 0
+        self.action_counts = {}
+        self.error_counts = {}
+        metrics.add_collector(self.collect_metrics)
+
+        # log actions handled by the bot, all other lines are skipped
+        self.actions = {}
+        self.action_prefixes = ()
+        self.register_action('ClientUserinfo', self.handle_userinfo)
+        self.register_action('ClientDisconnect', self.handle_disconnect)
+        self.register_action('say', self.handle_say)
+        self.register_action('InitGame', self.handle_initgame)
+
+    def read_log(self):
+        """
+        read the logfile
+        """
+        # create instance of Game
+        self.game = Game(self.config_file, section=self.section)
+
+        while self.log_tail:
+            lines = self.log_tail.read_lines()
+            if lines:
+                self.parse_lines(lines)
+            else:
+                if not self.game.live:
+                    self.replaying = False
+                    self.game.go_live()
+                    self.start_command_pool()
+                    self.start_player_poll()
+                self.log_tail.wait()
+
+    def start(self, loop):
+        """
+        read the logfile on the event loop instead of the blocking read_log loop
+
+        @param loop: The event loop
+        @type  loop: Instance
+        """
+        self.loop = loop
+        # create instance of Game
+        self.game = Game(self.config_file, loop, self.section)
+        if self.log_tail.fileno() is not None:
+            loop.add_reader(self.log_tail.fileno(), self.on_log_event)
+        self.schedule_poll(0)
+
+    def on_log_event(self):
+        """
+        handle a change notification of the games log file
+        """
+        if self.log_tail.read_events():
+            self.schedule_poll(0)
+
+    def schedule_poll(self, delay):
+        """
+        (re)schedule the next read of the logfile
+        """
+        if self.poll_timer:
+            self.loop.cancel_timer(self.poll_timer)
+        self.poll_timer = self.loop.call_later(delay, self.poll_log)
+
+    def poll_log(self):
+        """
+        parse the next chunk of the logfile, go live at the end of the file
+        """
+        self.poll_timer = None
+        lines = self.log_tail.read_lines()
+        if lines:
+            self.parse_lines(lines)
+            # let other files and the RCON traffic in before the next chunk
+            self.schedule_poll(0)
+        else:
+            if not self.game.live:
+                self.replaying = False
+                self.game.go_live()
+                self.start_command_pool()
+                self.start_player_poll()
+            self.schedule_poll(self.log_tail.interval)
+
+    def start_command_pool(self):
+        """
+        run the chat commands on the command workers from now on
+        """
+        if self.command_workers > 0 and not self.command_pool:
+            self.command_pool = CommandPool(self.command_workers, self.section)
+
+    def start_player_poll(self):
+        """
+        start reconciling the players with the RCON status of the server
+        """
+        if self.player_poll_min <= 0:
+            return
+        if self.loop:
+            self.schedule_player_poll(0)
+        else:
+            poller = Thread(target=self.player_poller, name='player poll %s' % self.section)
+            poller.setDaemon(True)
+            poller.start()
+
+    def next_player_poll(self, changes):
+        """
+        return the seconds until the next player poll, the interval is reset by changes and doubled otherwise
+        """
+        if changes:
+            self.player_poll_delay = self.player_poll_min
+        else:
+            self.player_poll_delay = min(self.player_poll_delay * 2, self.player_poll_max)
+        return self.player_poll_delay
+
+    def request_player_poll(self):
+        """
+        poll the players soon, e.g. after a command of an unknown player
+        """
+        self.player_poll_delay = self.player_poll_min
+        if self.loop and self.player_poll_min > 0:
+            self.schedule_player_poll(0)
+
+    def player_poller(self):
+        """
+        Thread process, reconcile the players with the RCON status
+        """
+        rcon_handle = self.game.rcon_handle
+        while 1:
+            try:
+                players = rcon_handle.get_status()
+                guids = {}
+                for ply in players:
+                    if ply.num not in self.game.players:
+                        guids[ply.num] = rcon_handle.get_userinfo(ply.num).get('cl_guid')
+                changes = self.reconcile_players(players, guids)
+            except Exception, err:
+                print "- Player poll failed: %s" % err
+                changes = 0
+            self.next_player_poll(changes)
+            # sleep in short steps, a requested poll shortens the delay
+            waited = 0
+            while waited < self.player_poll_delay:
+                time.sleep(self.player_poll_min)
+                waited += self.player_poll_min
+
+    def schedule_player_poll(self, delay):
+        """
+        (re)schedule the next player poll on the event loop
+        """
+        if self.player_poll_timer:
+            self.loop.cancel_timer(self.player_poll_timer)
+        self.player_poll_timer = self.loop.call_later(delay, self.poll_players)
+
+    def player_poll_stalled(self):
+        """
+        watchdog of a player poll whose RCON requests did not complete, abandon it and schedule the next one
+        """
+        print "- Player poll timed out."
+        self.player_poll_id += 1
+        self.player_poll_timer = None
+        self.schedule_player_poll(self.next_player_poll(0))
+
+    def poll_players(self):
+        """
+        request the RCON status and the userinfo of new players on the event loop, then reconcile the players
+        """
+        rcon_handle = self.game.rcon_handle
+        # the callbacks of an abandoned poll are ignored, a new poll or the watchdog replaces the timer
+        self.player_poll_id += 1
+        poll_id = self.player_poll_id
+        self.player_poll_timer = self.loop.call_later(self.player_poll_max, self.player_poll_stalled)
+
+        def status_done(text, error):
+            if poll_id != self.player_poll_id:
+                return
+            if error:
+                self.schedule_player_poll(self.next_player_poll(0))
+                return
+            players = rcon_handle.quake.parse_rcon_status(text)
+            guids = {}
+            new = [ply.num for ply in players if ply.num not in self.game.players]
+
+            # one dumpuser at a time through the rate limited send queue of Rcon
+            def request_userinfo():
+                if new:
+                    num = new.pop(0)
+                    rcon_handle.request('dumpuser %d' % num, lambda text, error: userinfo_done(num, text))
+                else:
+                    self.schedule_player_poll(self.next_player_poll(self.reconcile_players(players, guids)))
+
+            def userinfo_done(num, text):
+                if poll_id != self.player_poll_id:
+                    return
+                guids[num] = rcon_handle.quake.parse_dumpuser(text).get('cl_guid') if text is not None else None
+                request_userinfo()
+            request_userinfo()
+        rcon_handle.request('status', status_done)
+
+    def reconcile_players(self, players, guids):
+        """
+        apply the differences between the RCON status and the players of the game, return the number of changes
+
+        @param players: The players of the RCON status
+        @type  players: List
+        @param guids: The GUIDs of the players the game does not know yet by player number
+        @type  guids: Dictionary
+        """
+        changes = 0
+        with self.players_lock:
+            online = dict((ply.num, ply) for ply in players)
+            # the status may predate a join read from the log, so a player is removed when missing twice
+            missing = set([num for num in self.game.players if num != 1022 and num not in online])
+            removed = missing & self.missing_slots
+            for player_num in removed:
+                self.userinfo.pop(player_num, None)
+                self.game.remove_player(player_num)
+            self.missing_slots = missing - removed
+            changes += len(missing)
+            for player_num, ply in online.iteritems():
+                # the server appends ^7 to the name
+                name = ply.name[:-2] if ply.name.endswith('^7') else ply.name
+                name = "".join(name.split()) or "UnnamedPlayer"
+                if player_num not in self.game.players:
+                    self.game.add_player(Player(player_num, ply.address.split(":")[0], guids.get(player_num) or "None", name))
+                    changes += 1
+                elif self.game.players[player_num].get_name() != name:
+                    self.game.rename_player(player_num, name)
+                    changes += 1
+        return changes
+
+    def replay(self, path):
+        """
+        parse a complete games log file as fast as possible, used for offline replays
+
+        @param path: The full path of the games log file
+        @type  path: String
+
+        @return: The number of lines and the number of lines of each handled log action
+        """
+        counts = dict.fromkeys(self.actions, 0)
+        # only the lines of handled actions are copied out of the memory map, the leading
+        # line break lets the regex engine skip ahead to the next line quickly
+        action_reo = re.compile(r'\n( *\d+:\d\d (%s):.*)' % '|'.join([re.escape(action) for action in self.actions]))
+        with open(path, 'rb') as log_file:
+            if not os.fstat(log_file.fileno()).st_size:
+                return 0, counts
+            data = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            end = data.find('\n')
+            first = action_reo.match('\n' + (data[:end] if end != -1 else data[:]))
+            with self.players_lock:
+                for match in chain([first] if first else [], action_reo.finditer(data)):
+                    counts[match.group(2)] += 1
+                    self.batch_time = time.time()
+                    self.parse_line(match.group(1))
+            lines = 0 if data[-1] == '\n' else 1
+            for pos in xrange(0, len(data), 1048576):
+                lines += data[pos:pos + 1048576].count('\n')
+        finally:
+            data.close()
+        return lines, counts
+
+    def collect_metrics(self):
+        """
+        return the line counters for the metrics endpoint
+        """
+        samples = [('pcwbot_log_lines_total', (('server', self.section),), self.line_count)]
+        for action, count in self.action_counts.items():
+            samples.append(('pcwbot_log_actions_total', (('server', self.section), ('action', action)), count))
+        for action, count in self.error_counts.items():
+            samples.append(('pcwbot_handler_errors_total', (('server', self.section), ('action', action)), count))
+        if self.command_pool:
+            samples.append(('pcwbot_command_queue_depth', (('server', self.section),), self.command_pool.depth()))
+        return samples
+
+    def parse_lines(self, lines):
+        """
+        parse a batch of log lines while holding the players lock only once
+        """
+        self.batch_time = time.time()
+        with self.players_lock:
+            self.line_count += len(lines)
+            for line in lines:
+                self.parse_line(line)
+
+    def register_action(self, action, handler):
+        """
+        register a handler for a log action, replaces an existing handler of the action
+
+        @param action: The log action, e.g. 'ClientUserinfo'
+        @type  action: String
+        @param handler: The callable which gets the stripped rest of the log line, it runs with the players lock held
+        @type  handler: Callable
+        """
+        self.actions[action] = handler
+        self.action_counts.setdefault(action, 0)
+        self.error_counts.setdefault(action, 0)
+        self.action_prefixes = tuple(["%s:" % name for name in self.actions])
+
+    def parse_line(self, string):
+        """
+        parse the logfile and search for specific action, the caller holds the players lock
+        """
+        # the action follows the game time and a space, the game time is 7 characters wide
+        # up to 999:59, reject unhandled actions without slicing the line
+        begin = string.find(' ', string.find(':')) + 1
+        if not begin or not string.startswith(self.action_prefixes, begin):
+            return
+        pos = string.find(":", begin)
+        action = string[begin:pos]
+        if action not in self.actions:
+            return
+        self.action_counts[action] += 1
+        start = time.time()
+        try:
+            self.actions[action](string[pos + 1:].strip())
+        except (IndexError, KeyError):
+            # unknown players and incomplete lines
+            self.error_counts[action] += 1
+        except Exception, err:
+            self.error_counts[action] += 1
+            print "%s: %s" % (err.__class__.__name__, err)
+        slow_log.check('parse_line', time.time() - start, string)
+
+    @staticmethod
+    def extract_userinfo(info, keys):
+        """
+        return the values of the given keys of a userinfo string, None for missing keys
+
+        @param info: The userinfo string without leading backslash, e.g. 'ip\\1.2.3.4:27960\\name\\Player'
+        @type  info: String
+        @param keys: The keys to extract
+        @type  keys: Sequence
+        """
+        items = info.split('\\')
+        # keys are at the even positions, values never contain a backslash
+        names = items[0::2]
+        values = []
+        for key in keys:
+            try:
+                values.append(items[2 * names.index(key) + 1].rstrip())
+            except (ValueError, IndexError):
+                values.append(None)
+        return values
+
+    def handle_userinfo(self, line):
+        """
+        handle player user information, auto-kick known cheater ports or guids
+        """
+        player_num, _, info = line.partition(' ')
+        player_num = int(player_num)
+        info = info.lstrip().lstrip('\\')
+        if self.userinfo.get(player_num) == info and player_num in self.game.players:
+            return
+        self.userinfo[player_num] = info
+        name, ip_port, guid = self.extract_userinfo(info, ('name', 'ip', 'cl_guid'))
+        name = "".join(name.split()) if name is not None else "UnnamedPlayer"
+        ip_address = ip_port.split(":")[0].strip() if ip_port is not None else "0.0.0.0"
+        if guid is None:
+            guid = "None"
+
+        if player_num not in self.game.players:
+            player = Player(player_num, ip_address, guid, name)
+            self.game.add_player(player)
+
+        if self.game.players[player_num].get_guid() != guid:
+            self.game.players[player_num].set_guid(guid)
+            self.game.players[player_num].check_database()
+        if self.game.players[player_num].get_name() != name:
+            self.game.rename_player(player_num, name)
+
+    def handle_initgame(self, line):
+        """
+        handle new map, refresh the map list in the background
+        """
+        if self.game.live:
+            self.game.refresh_maps()
+
+    def handle_disconnect(self, line):
+        """
+        handle player disconnect
+        """
+        player_num = int(line)
+        self.userinfo.pop(player_num, None)
+        self.game.remove_player(player_num)
+
+    def player_found(self, user):
+        """
+        return True and instance of player or False and message text
+        """
+        with self.players_lock:
+            matches = self.game.find_players(user)
+        if not matches:
+            return False, None, "^3No Player found"
+        elif len(matches) > 1:
+            return False, None, "^7Players matching %s: ^3%s" % (user, ', '.join(["^3%s [^2%d^3]" % (player.get_name(), player.get_player_num()) for player in matches]))
+        else:
+            return True, matches[0], None
+
+    def map_found(self, map_name):
+        """
+        return True and map name or False and message text
+        """
+        map_list = self.game.map_catalog.find(map_name)
+        if not map_list:
+            return False, None, "^3Map not found"
+        elif len(map_list) > 1:
+            return False, None, "^7Maps matching %s: ^3%s" % (map_name, ', '.join(map_list))
+        else:
+            return True, map_list[0], None
+
+    def register_command(self, command):
+        """
+        register a chat command and its aliases, replaces existing commands with the same name
+
+        @param command: The command
+        @type  command: Instance
+        """
+        self.commands['!%s' % command.name] = command
+        for alias in command.aliases:
+            self.commands['!%s' % alias] = command
+        self.help_messages.clear()
+
+    def get_command_names(self, role):
+        """
+        return the sorted names of all visible commands available for the given admin role
+        """
+        return sorted(set([cmd.name for cmd in self.commands.itervalues() if cmd.role <= role and not cmd.hidden]))
+
+    def handle_say(self, line):
+        """
+        handle say commands
+        """
+        # commands of a replayed log have been handled by the previous run
+        if self.replaying:
+            return
+        try:
+            divider = line.strip().split(": ", 1)
+            player_num = int(divider[0].split(" ", 1)[0])
+            text = divider[1].split(None, 1)
+        except (IndexError, ValueError):
+            return
+        if not text or text[0] not in self.commands:
+            return
+
+        command = self.commands[text[0]]
+        player = self.game.players.get(player_num)
+        if player is None:
+            # the join of the player has been missed
+            self.request_player_poll()
+            return
+        role = player.get_admin_role()
+        if role < command.role:
+            if role >= 40 and not command.hidden:
+                self.reply(player_num, "^7Insufficient privileges to use command ^3%s" % text[0])
+            return
+
+        args = command.parse_args(text[1].strip() if len(text) > 1 else '')
+        if args is None:
+            self.reply(player_num, command.usage)
+        elif self.command_pool:
+            # the reader only parses, a slow command must not delay the following lines
+            self.command_pool.submit(player_num, self.run_command, command, player, args, self.batch_time)
+        else:
+            self.run_command(command, player, args, self.batch_time)
+
+    def reply(self, player_num, msg):
+        """
+        send a private message in order with the commands of the player waiting for a command worker
+        """
+        if self.command_pool:
+            self.command_pool.submit(player_num, self.game.rcon_tell, player_num, msg)
+        else:
+            self.game.rcon_tell(player_num, msg)
+
+    def run_command(self, command, player, args, read_time):
+        """
+        run the handler of a chat command, on a command worker or on the log reading thread
+
+        @param command: The command
+        @type  command: Instance
+        @param player: The calling player
+        @type  player: Instance
+        @param args: The parsed arguments
+        @type  args: List
+        @param read_time: The time the command has been read from the log
+        @type  read_time: Float
+        """
+        start = time.time()
+        try:
+            command.handler(player, args)
+        except Exception, err:
+            with self.players_lock:
+                self.error_counts['say'] += 1
+            if not isinstance(err, (IndexError, KeyError)):
+                print "%s: %s" % (err.__class__.__name__, err)
+        slow_log.check('command', time.time() - start, command.name)
+        metrics.observe('pcwbot_command_latency_seconds', time.time() - read_time, (('server', self.section), ('command', command.name)))
+
+    def cmd_help(self, player, args):
         """
-        parse the response message and return a list
+        help - list all available commands
         """
-        split = data[1:].split('\\')
-        values = dict(zip(split[::2], split[1::2]))
-        # if there are \n's in one of the values, it's the list of players
-        for var, val in values.items():
-            pos = val.find('\n')
-            if pos == -1:
-                continue
-            split = val.split('\n', 1)
-            values[var] = split[0]
-            self.parse_players(split[1])
-        return values
+        role = player.get_admin_role()
+        msg = self.help_messages.get(role)
+        if msg is None:
+            msg = self.help_messages[role] = "^7%s commands: ^3%s" % (player.roles.get(role, "Admin"), ", ".join(self.get_command_names(role)))
+        self.game.rcon_tell(player.get_player_num(), msg)
 
-    def parse_players(self, data):
+## admin level 40
+    def cmd_force(self, player, args):
         """
-        parse player information - name, frags and ping
+        force - force a player to the given team
         """
-        self.players = []
-        for player in data.split('\n'):
-            if not player:
-                continue
-            match = self.player_reo.match(player)
-            if not match:
-                print 'couldnt match', player
-                continue
-            frags, ping, name = match.groups()
-            self.players.append(Q3Player(1, name, frags, ping))
+        found, victim, msg = self.player_found(args[0])
+        if not found:
+            self.game.rcon_tell(player.get_player_num(), msg)
+        elif args[1] in self.team_dict:
+            self.game.rcon_forceteam(victim.get_player_num(), self.team_dict[args[1]])
+        else:
+            self.game.rcon_tell(player.get_player_num(), "^7Usage: !force <name> <blue/red/spec>")
 
-    def update(self):
+    def cmd_kick(self, player, args):
         """
-        get status
+        kick - kick a player
         """
-        data = self.command('getstatus')[1]
-        self.values = self.parse_status(data)
+        found, victim, msg = self.player_found(args[0])
+        if not found:
+            self.game.rcon_tell(player.get_player_num(), msg)
+        elif player.get_player_num() != victim.get_player_num():
+            self.game.kick_player(victim.get_player_num())
+        else:
+            self.game.rcon_tell(player.get_player_num(), "^7You cannot kick yourself")
 
-    def rcon_update(self):
+    def cmd_list(self, player, args):
         """
-        perform RCON status update
+        list - list all connected players
         """
-        data = self.rcon('status')[1]
-        lines = data.split('\n')
-
-        players = lines[3:]
-        self.players = []
-        for ply in players:
-            while ply.find('  ') != -1:
-                ply = ply.replace('  ', ' ')
-            while ply.find(' ') == 0:
-                ply = ply[1:]
-            if ply == '':
-                continue
-            ply = ply.split(' ')
-            try:
-                self.players.append(Q3Player(int(ply[0]), ply[3], int(ply[1]), int(ply[2]), ply[5]))
-            except (IndexError, ValueError):
-                continue
+        with self.players_lock:
+            msg = self.game.get_player_list()
+        self.game.rcon_tell(player.get_player_num(), msg)
 
+    def cmd_veto(self, player, args):
+        """
+        veto - stop voting process
+        """
+        self.game.send_rcon('veto')
 
-### CLASS Rcon ###
-class Rcon(object):
-    """
-    RCON class, version 1.0.7
-    """
+    def cmd_reload(self, player, args):
+        """
+        reload - reload map
+        """
+        self.game.send_rcon('reload')
 
-    def __init__(self, host, port, passwd):
+    def cmd_password(self, player, args):
         """
-        create a new instance of Rcon
+        password - set private server password
+        """
+        if args:
+            self.game.send_rcon('g_password %s' % args[0])
+            self.game.rcon_tell(player.get_player_num(), "^7Password set to '%s' - Server is private" % args[0])
+        else:
+            self.game.send_rcon('g_password ""')
+            self.game.rcon_tell(player.get_player_num(), "^7Password removed - Server is public")
 
-        @param host: The server IP address
-        @type  host: String
-        @param port: The server port
-        @type  port: String
-        @param passwd: The RCON password
-        @type  passwd: String
+    def cmd_exec(self, player, args):
         """
-        self.live = False
-        self.quake = PyQuake3("%s:%s" % (host, port), passwd)
-        self.queue = Queue()
-        self.rcon_lock = RLock()
-        # start Thread
-        self.processor = Thread(target=self.process)
-        self.processor.setDaemon(True)
-        self.processor.start()
+        exec - execute config file
+        """
+        self.game.send_rcon('exec %s' % args[0])
 
-    def push(self, msg):
+    def cmd_map(self, player, args):
         """
-        execute RCON command
+        map - load given map
+        """
+        found, newmap, msg = self.map_found(args[0])
+        if not found:
+            self.game.rcon_tell(player.get_player_num(), msg)
+        else:
+            self.game.send_rcon('map %s' % newmap)
 
-        @param msg: The RCON command
-        @type  msg: String
+    def cmd_setnextmap(self, player, args):
         """
-        if self.live:
-            with self.rcon_lock:
-                self.queue.put(msg)
+        setnextmap - set the given map as nextmap
+        """
+        found, nextmap, msg = self.map_found(args[0])
+        if not found:
+            self.game.rcon_tell(player.get_player_num(), msg)
+        else:
+            self.game.send_rcon('g_nextmap %s' % nextmap)
 
-    def go_live(self):
+    def cmd_cyclemap(self, player, args):
         """
-        go live
+        cyclemap - start next map in rotation
         """
-        self.live = True
+        self.game.send_rcon('cyclemap')
 
-    def get_rcon_output(self, value):
+    def cmd_swapteams(self, player, args):
         """
-        get RCON output for value
+        swapteams - swap current teams
         """
-        if self.live:
-            with self.rcon_lock:
-                return self.quake.rcon(value)
+        self.game.send_rcon('swapteams')
 
-    def process(self):
+## head admin level 100
+    def cmd_leveltest(self, player, args):
         """
-        Thread process
+        leveltest - get the admin level for a given player or myself
         """
-        while 1:
-            if not self.queue.empty():
-                if self.live:
-                    with self.rcon_lock:
-                        try:
-                            command = self.queue.get()
-                            if command != 'status':
-                                self.quake.rcon(command)
-                            else:
-                                self.quake.rcon_update()
-                        except Exception:
-                            pass
-            time.sleep(.33)
+        if args:
+            found, victim, msg = self.player_found(args[0])
+            if not found:
+                self.game.rcon_tell(player.get_player_num(), msg)
+                return
+        else:
+            victim = player
+        self.game.rcon_tell(player.get_player_num(), "^3Level %s [^2%d^3]: ^7%s" % (victim.get_name(), victim.get_admin_role(), victim.roles[victim.get_admin_role()]))
 
+    def cmd_putgroup(self, player, args):
+        """
+        putgroup - add a client to a group
+        """
+        user, right = args[:2]
+        found, victim, msg = self.player_found(user)
+        if not found:
+            self.game.rcon_tell(player.get_player_num(), msg)
+            return
+        with self.admin_lock:
+            self.put_group(player, victim, right)
 
-### CLASS Log Parser ###
-class LogParser(object):
-    """
-    log file parser
-    """
-    def __init__(self, config_file):
+    def put_group(self, player, victim, right):
         """
-        create a new instance of LogParser
+        register the victim if needed and put it in the given group
+        """
+        if victim.get_registered_user():
+            new_role = victim.get_admin_role()
+        else:
+            # register new user in DB and set role to 1
+            victim.register_user_db(role=1)
+            new_role = 1
+
+        if right == "user":
+            self.game.rcon_tell(player.get_player_num(), "^3%s put in group User" % victim.get_name())
+            new_role = 1
+        elif right == "admin":
+            self.game.rcon_tell(player.get_player_num(), "^3%s added as ^7Admin" % victim.get_name())
+            new_role = 40
+        else:
+            self.game.rcon_tell(player.get_player_num(), "^3Sorry, you cannot put %s in group <%s>" % (victim.get_name(), right))
+        victim.update_db_admin_role(role=new_role)
 
-        @param config_file: The full path of the bot configuration file
-        @type  config_file: String
+    def cmd_ungroup(self, player, args):
+        """
+        ungroup - remove the admin level from a player
         """
-        # RCON commands for the different admin roles
-        self.admin_cmds = ['cyclemap', 'exec', 'force', 'kick', 'list', 'map', 'password', 'reload', 'setnextmap', 'swapteams', 'veto']
-        self.headadmin_cmds = self.admin_cmds + ['leveltest', 'putgroup', 'ungroup']
-        # alphabetic sort of the commands
-        self.admin_cmds.sort()
-        self.headadmin_cmds.sort()
+        found, victim, msg = self.player_found(args[0])
+        if not found:
+            self.game.rcon_tell(player.get_player_num(), msg)
+        else:
+            with self.admin_lock:
+                changed = 1 < victim.get_admin_role() < 100
+                if changed:
+                    victim.update_db_admin_role(role=1)
+            if changed:
+                self.game.rcon_tell(player.get_player_num(), "^3%s put in group User" % victim.get_name())
+            else:
+                self.game.rcon_tell(player.get_player_num(), "^3Sorry, you cannot put %s in group User" % victim.get_name())
 
-        self.config_file = config_file
-        config = ConfigParser.ConfigParser()
-        config.read(config_file)
-        print "- Imported config file '%s' successful." % config_file
+## iamgod
+    def cmd_iamgod(self, player, args):
+        """
+        iamgod - register user as Head Admin
+        """
+        # enable/disable option to get Head Admin by checking existence of head admin in database
+        with self.admin_lock:
+            if admin_cache.has_head_admin():
+                return
+            if not player.get_registered_user():
+                # register new user in DB and set admin role to 100
+                player.register_user_db(role=100)
+            else:
+                player.update_db_admin_role(role=100)
+        self.game.rcon_tell(player.get_player_num(), "^7You are registered as ^6Head Admin")
 
-        games_log = config.get('server', 'log_file')
-        # open game log file
-        self.log_file = open(games_log, 'r')
-        # go to the end of the file
-        self.log_file.seek(0, 2)
-        print "- Parsing games log file '%s' successful." % games_log
 
-        self.game = None
-        self.players_lock = RLock()
+### Database Schema ###
+def migrate_initial_schema(cursor):
+    """
+    create the admins and the maps table
+    """
+    cursor.execute('CREATE TABLE IF NOT EXISTS admins (id INTEGER PRIMARY KEY NOT NULL, guid TEXT NOT NULL, name TEXT NOT NULL, ip_address TEXT NOT NULL, admin_role INTEGER DEFAULT 1)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS maps (server TEXT NOT NULL, name TEXT NOT NULL, updated INTEGER NOT NULL, PRIMARY KEY (server, name))')
 
-        # enable/disable option to get Head Admin by checking existence of head admin in database
-        curs.execute("SELECT COUNT(*) FROM `admins` WHERE `admin_role` = 100")
-        self.iamgod = True if curs.fetchone()[0] < 1 else False
 
-        # start parsing the games logfile
-        self.read_log()
+def migrate_admin_indexes(cursor):
+    """
+    remove duplicate GUIDs, keeping the latest row, and index guid and admin_role
+    """
+    cursor.execute('DELETE FROM admins WHERE id NOT IN (SELECT MAX(id) FROM admins GROUP BY guid)')
+    cursor.execute('CREATE UNIQUE INDEX admins_guid ON admins (guid)')
+    cursor.execute('CREATE INDEX admins_admin_role ON admins (admin_role)')
 
-    def read_log(self):
-        """
-        read the logfile
-        """
-        # create instance of Game
-        self.game = Game(self.config_file)
 
-        while self.log_file:
-            line = self.log_file.readline()
-            if line:
-                self.parse_line(line)
-            else:
-                if not self.game.live:
-                    self.game.go_live()
-                time.sleep(.125)
+# schema version (stored as user_version in the database), description, migration
+MIGRATIONS = [(1, "initial schema", migrate_initial_schema),
+              (2, "unique GUIDs, index on admin role", migrate_admin_indexes)]
 
-    def parse_line(self, string):
-        """
-        parse the logfile and search for specific action
-        """
-        line = string[7:]
-        tmp = line.split(":", 1)
-        line = tmp[1].strip() if len(tmp) > 1 else tmp[0].strip()
-        try:
-            action = tmp[0].strip()
-            if action == 'ClientUserinfo':
-                self.handle_userinfo(line)
-            elif action == 'ClientDisconnect':
-                self.handle_disconnect(line)
-            elif action == 'say':
-                self.handle_say(line)
-        except (IndexError, KeyError):
-            pass
-        except Exception, err:
-            print "%s: %s" % (err.__class__.__name__, err)
 
-    def explode_line(self, line):
-        """
-        explode line
-        """
-        arr = line.lstrip().lstrip('\\').split('\\')
-        key = True
-        key_val = None
-        values = {}
-        for item in arr:
-            if key:
-                key_val = item
-                key = False
-            else:
-                values[key_val.rstrip()] = item.rstrip()
-                key_val = None
-                key = True
-        return values
+def migrate_database(connection):
+    """
+    bring the database schema up to date, each migration runs in its own transaction
 
-    def handle_userinfo(self, line):
+    @param connection: The sqlite database connection
+    @type  connection: sqlite3.Connection
+
+    @return: List of the applied migrations
+    """
+    applied = []
+    cursor = connection.cursor()
+    # manage the transactions explicitly, the sqlite3 module commits before each DDL statement
+    isolation_level = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        cursor.execute("PRAGMA user_version")
+        current = cursor.fetchone()[0]
+        for version, description, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            cursor.execute("BEGIN")
+            try:
+                migration(cursor)
+                cursor.execute("PRAGMA user_version = %d" % version)
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+            applied.append((version, description))
+    finally:
+        connection.isolation_level = isolation_level
+    return applied
+
+
+### CLASS Database Writer ###
+class DatabaseWriter(object):
+    """
+    single writer thread for the database, queued writes are grouped into transactions
+    """
+    def __init__(self, path, batch_size=100):
         """
-        handle player user information, auto-kick known cheater ports or guids
+        create a new instance of DatabaseWriter and start the writer thread
+
+        @param path: The path of the sqlite database
+        @type  path: String
+        @param batch_size: The maximum number of writes per transaction
+        @type  batch_size: Integer
         """
-        with self.players_lock:
-            player_num = int(line[:2].strip())
-            line = line[2:].lstrip("\\").lstrip()
-            values = self.explode_line(line)
-            name = re.sub(r"\s+", "", values['name']) if 'name' in values else "UnnamedPlayer"
-            ip_port = values['ip'] if 'ip' in values else "0.0.0.0:0"
-            guid = values['cl_guid'] if 'cl_guid' in values else "None"
-            ip_address = ip_port.split(":")[0].strip()
-
-            if player_num not in self.game.players:
-                player = Player(player_num, ip_address, guid, name)
-                self.game.add_player(player)
-
-            if self.game.players[player_num].get_guid() != guid:
-                self.game.players[player_num].set_guid(guid)
-            if self.game.players[player_num].get_name() != name:
-                self.game.players[player_num].set_name(name)
+        self.path = path
+        self.batch_size = batch_size
+        self.jobs = Queue()
+        # statistics
+        self.written = 0
+        self.transactions = 0
+        self.errors = 0
+        self.writer = Thread(target=self.process, name='database writer')
+        self.writer.setDaemon(True)
+        self.writer.start()
 
-    def handle_disconnect(self, line):
+    def execute(self, sql, values=()):
         """
-        handle player disconnect
+        queue a write statement, returns immediately
         """
-        with self.players_lock:
-            player_num = int(line)
-            del self.game.players[player_num]
+        self.jobs.put((sql, values, False))
 
-    def player_found(self, user):
+    def executemany(self, sql, values):
         """
-        return True and instance of player or False and message text
+        queue a write statement for each set of values, returns immediately
         """
-        victim = None
-        name_list = []
-        append = name_list.append
-        for player in self.game.players.itervalues():
-            player_name = player.get_name()
-            player_num = player.get_player_num()
-            if (user.upper() == player_name.upper() or user == str(player_num)) and player_num != 1022:
-                victim = player
-                name_list = ["^3%s [^2%d^3]" % (player_name, player_num)]
-                break
-            elif user.upper() in player_name.upper() and player_num != 1022:
-                victim = player
-                append("^3%s [^2%d^3]" % (player_name, player_num))
-        if len(name_list) == 0:
-            return False, None, "^3No Player found"
-        elif len(name_list) > 1:
-            return False, None, "^7Players matching %s: ^3%s" % (user, ', '.join(name_list))
-        else:
-            return True, victim, None
+        self.jobs.put((sql, values, True))
 
-    def map_found(self, map_name):
+    def flush(self):
         """
-        return True and map name or False and message text
+        block until all queued writes have been committed
         """
-        map_list = []
-        append = map_list.append
-        for maps in self.game.get_all_maps():
-            if map_name.lower() == maps or ('ut4_%s' % map_name.lower()) == maps:
-                append(maps)
-                break
-            elif map_name.lower() in maps:
-                append(maps)
-        if not map_list:
-            return False, None, "^3Map not found"
-        elif len(map_list) > 1:
-            return False, None, "^7Maps matching %s: ^3%s" % (map_name, ', '.join(map_list))
-        else:
-            return True, map_list[0], None
+        done = Event()
+        self.jobs.put((None, done, False))
+        done.wait()
 
-    def handle_say(self, line):
+    def process(self):
         """
-        handle say commands
+        Thread process, write the queued statements in batches
         """
-        with self.players_lock:
-            line = line.strip()
+        # the connection belongs to this thread
+        db_conn = sqlite3.connect(self.path)
+        db_conn.execute("PRAGMA synchronous = NORMAL")
+        while 1:
+            batch = [self.jobs.get()]
             try:
-                divider = line.split(": ", 1)
-                number = divider[0].split(" ", 1)[0]
-                cmd = divider[1].split()[0]
-
-                sar = {'player_num': int(number), 'command': cmd}
-            except IndexError:
-                sar = {'player_num': 1022, 'command': ''}
-
-            if sar['command'] == '!help' or sar['command'] == '!h':
-                if self.game.players[sar['player_num']].get_admin_role() == 40:
-                    self.game.rcon_tell(sar['player_num'], "^7Admin commands: ^3%s" % ", ".join(self.admin_cmds))
-                elif self.game.players[sar['player_num']].get_admin_role() > 80:
-                    self.game.rcon_tell(sar['player_num'], "^7Head Admin commands: ^3%s" % ", ".join(self.headadmin_cmds))
-
-## admin level 40
-            # force - force a player to the given team
-            elif sar['command'] == '!force' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if line.split(sar['command'])[1]:
-                    arg = line.split(sar['command'])[1].split()
-                    if len(arg) > 1:
-                        user = arg[0]
-                        team = arg[1]
-                        team_dict = {'red': 'red', 'r': 'red', 're': 'red',
-                                     'blue': 'blue', 'b': 'blue', 'bl': 'blue', 'blu': 'blue',
-                                     'spec': 'spectator', 'spectator': 'spectator', 's': 'spectator', 'sp': 'spectator', 'spe': 'spectator',
-                                     'green': 'green'}
-                        found, victim, msg = self.player_found(user)
-                        if not found:
-                            self.game.rcon_tell(sar['player_num'], msg)
-                        else:
-                            if team in team_dict:
-                                victim_player_num = victim.get_player_num()
-                                self.game.rcon_forceteam(victim_player_num, team_dict[team])
-                            else:
-                                self.game.rcon_tell(sar['player_num'], "^7Usage: !force <name> <blue/red/spec>")
-                    else:
-                        self.game.rcon_tell(sar['player_num'], "^7Usage: !force <name> <blue/red/spec>")
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !force <name> <blue/red/spec>")
-
-            # kick - kick a player
-            elif (sar['command'] == '!kick' or sar['command'] == '!k') and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if line.split(sar['command'])[1]:
-                    user = line.split(sar['command'])[1].strip()
-                    found, victim, msg = self.player_found(user)
-                    if not found:
-                        self.game.rcon_tell(sar['player_num'], msg)
-                    else:
-                        if sar['player_num'] != victim.get_player_num():
-                            self.game.kick_player(victim.get_player_num())
-                        else:
-                            self.game.rcon_tell(sar['player_num'], "^7You cannot kick yourself")
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !kick <name>")
-
-            # list - list all connected players
-            elif sar['command'] == '!list' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                msg = "^7Current players: %s" % ", ".join(["^3%s [^2%d^3]" % (player.get_name(), player.get_player_num()) for player in self.game.players.itervalues() if player.get_player_num() != 1022])
-                self.game.rcon_tell(sar['player_num'], msg)
-
-            # veto - stop voting process
-            elif sar['command'] == '!veto' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                self.game.send_rcon('veto')
-
-            # reload
-            elif sar['command'] == '!reload' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                self.game.send_rcon('reload')
-
-            # password - set private server password
-            elif sar['command'] == '!password' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if line.split(sar['command'])[1]:
-                    arg = line.split(sar['command'])[1].strip()
-                    self.game.send_rcon('g_password %s' % arg)
-                    self.game.rcon_tell(sar['player_num'], "^7Password set to '%s' - Server is private" % arg)
-                else:
-                    self.game.send_rcon('g_password ""')
-                    self.game.rcon_tell(sar['player_num'], "^7Password removed - Server is public")
-
-            # exec - execute config file
-            elif sar['command'] == '!exec' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if line.split(sar['command'])[1]:
-                    arg = line.split(sar['command'])[1].strip()
-                    self.game.send_rcon('exec %s' % arg)
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !exec <filename>")
-
-            # map - load given map
-            elif sar['command'] == '!map' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if line.split(sar['command'])[1]:
-                    arg = line.split(sar['command'])[1].strip()
-                    found, newmap, msg = self.map_found(arg)
-                    if not found:
-                        self.game.rcon_tell(sar['player_num'], msg)
-                    else:
-                        self.game.send_rcon('map %s' % newmap)
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !map <ut4_name>")
-
-            # setnextmap - set the given map as nextmap
-            elif sar['command'] == '!setnextmap' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if line.split(sar['command'])[1]:
-                    arg = line.split(sar['command'])[1].strip()
-                    found, nextmap, msg = self.map_found(arg)
-                    if not found:
-                        self.game.rcon_tell(sar['player_num'], msg)
-                    else:
-                        self.game.send_rcon('g_nextmap %s' % nextmap)
+                while len(batch) < self.batch_size:
+                    batch.append(self.jobs.get_nowait())
+            except Empty:
+                pass
+            waiting = [values for sql, values, many in batch if sql is None]
+            writes = [job for job in batch if job[0] is not None]
+            start = time.time()
+            try:
+                if writes:
+                    self.write(db_conn, writes)
+                metrics.observe('pcwbot_sqlite_seconds', time.time() - start, (('query', 'write_batch'),))
+            except sqlite3.Error:
+                # one bad statement must not discard the other writes of the batch
+                for job in writes:
+                    try:
+                        self.write(db_conn, [job])
+                    except sqlite3.Error, err:
+                        self.errors += 1
+                        print "- Writing to the database failed: %s (%s %r)" % (err, job[0], job[1])
+            for done in waiting:
+                done.set()
+
+    def write(self, db_conn, jobs):
+        """
+        execute the write jobs in one transaction, rolled back completely on errors
+        """
+        with db_conn:
+            for sql, values, many in jobs:
+                if many:
+                    db_conn.executemany(sql, values)
                 else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !setnextmap <ut4_name>")
+                    db_conn.execute(sql, values)
+        self.written += len(jobs)
+        self.transactions += 1
 
-            # cyclemap - start next map in rotation
-            elif sar['command'] == '!cyclemap' and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                self.game.send_rcon('cyclemap')
 
-            # swapteams - swap current teams
-            elif sar['command'] == '!swapteams' and self.game.players[sar['player_num']].get_admin_role() >= 80:
-                self.game.send_rcon('swapteams')
+### CLASS Admin Cache ###
+class AdminCache(object):
+    """
+    LRU cache of the admin roles by GUID in front of the admins table
+    """
+    def __init__(self, path, size=10000):
+        """
+        create a new instance of AdminCache and load the admins table
+
+        @param path: The path of the sqlite database
+        @type  path: String
+        @param size: The maximum number of cached GUIDs
+        @type  size: Integer
+        """
+        # own connection, misses are looked up from the log reader, the command workers and the player poller,
+        # all queries hold the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.curs = self.connection.cursor()
+        self.size = max(size, 1)
+        # GUID -> admin role or None for unregistered GUIDs, least recently used first
+        self.roles = OrderedDict()
+        self.lock = RLock()
+        # True as long as every registered GUID is cached, a miss means unregistered then
+        self.complete = True
+        self.head_admin = False
+        self.load()
+
+    def load(self):
+        """
+        load the most recently registered GUIDs up to the cache size
+        """
+        with self.lock:
+            start = time.time()
+            self.curs.execute("SELECT `guid`, `admin_role` FROM `admins` ORDER BY `id` DESC LIMIT ?", (self.size,))
+            result = self.curs.fetchall()
+            self.roles.clear()
+            for guid, role in reversed(result):
+                self.roles[guid] = role
+            self.complete = len(result) < self.size
+            self.curs.execute("SELECT COUNT(*) FROM `admins` WHERE `admin_role` = 100")
+            self.head_admin = self.curs.fetchone()[0] > 0
+            metrics.observe('pcwbot_sqlite_seconds', time.time() - start, (('query', 'load_admins'),))
+
+    def store(self, guid, role):
+        """
+        cache the role of the GUID as most recently used entry and evict the least recently used one
+        """
+        self.roles.pop(guid, None)
+        self.roles[guid] = role
+        if len(self.roles) > self.size:
+            if self.roles.popitem(last=False)[1] is not None:
+                self.complete = False
+
+    def get_role(self, guid):
+        """
+        return the admin role of the GUID or None if the GUID is not registered
+
+        @param guid: The GUID of the player
+        @type  guid: String
+        """
+        with self.lock:
+            if guid in self.roles:
+                role = self.roles[guid]
+            elif self.complete:
+                return None
+            else:
+                start = time.time()
+                self.curs.execute("SELECT `admin_role` FROM `admins` WHERE `guid` = ?", (guid,))
+                result = self.curs.fetchone()
+                role = result[0] if result else None
+                metrics.observe('pcwbot_sqlite_seconds', time.time() - start, (('query', 'admin_role'),))
+            self.store(guid, role)
+            return role
 
-## head admin level 100
-            # leveltest
-            elif (sar['command'] == '!leveltest' or sar['command'] == '!lt') and self.game.players[sar['player_num']].get_admin_role() == 100:
-                if line.split(sar['command'])[1]:
-                    user = line.split(sar['command'])[1].strip()
-                    found, victim, msg = self.player_found(user)
-                    if not found:
-                        self.game.rcon_tell(sar['player_num'], msg)
-                    else:
-                        self.game.rcon_tell(sar['player_num'], "^3Level %s [^2%d^3]: ^7%s" % (victim.get_name(), victim.get_admin_role(), victim.roles[victim.get_admin_role()]))
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^3Level %s [^2%d^3]: ^7%s" % (self.game.players[sar['player_num']].get_name(), self.game.players[sar['player_num']].get_admin_role(), self.game.players[sar['player_num']].roles[self.game.players[sar['player_num']].get_admin_role()]))
-
-            # putgroup - add a client to a group
-            elif sar['command'] == '!putgroup' and self.game.players[sar['player_num']].get_admin_role() == 100:
-                if line.split(sar['command'])[1]:
-                    arg = line.split(sar['command'])[1].split()
-                    if len(arg) > 1:
-                        user = arg[0]
-                        right = arg[1]
-                        found, victim, msg = self.player_found(user)
-                        if not found:
-                            self.game.rcon_tell(sar['player_num'], msg)
-                        else:
-                            if victim.get_registered_user():
-                                new_role = victim.get_admin_role()
-                            else:
-                                # register new user in DB and set role to 1
-                                victim.register_user_db(role=1)
-                                new_role = 1
-
-                            if right == "user":
-                                self.game.rcon_tell(sar['player_num'], "^3%s put in group User" % victim.get_name())
-                                new_role = 1
-                            elif right == "admin":
-                                self.game.rcon_tell(sar['player_num'], "^3%s added as ^7Admin" % victim.get_name())
-                                new_role = 40
-                            else:
-                                self.game.rcon_tell(sar['player_num'], "^3Sorry, you cannot put %s in group <%s>" % (victim.get_name(), right))
-                            victim.update_db_admin_role(role=new_role)
-                    else:
-                        self.game.rcon_tell(sar['player_num'], "^7Usage: !putgroup <name> <group>")
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !putgroup <name> <group>")
-
-            # ungroup - remove the admin level from a player
-            elif sar['command'] == '!ungroup' and self.game.players[sar['player_num']].get_admin_role() == 100:
-                if line.split(sar['command'])[1]:
-                    user = line.split(sar['command'])[1].strip()
-                    found, victim, msg = self.player_found(user)
-                    if not found:
-                        self.game.rcon_tell(sar['player_num'], msg)
-                    else:
-                        if 1 < victim.get_admin_role() < 100:
-                            self.game.rcon_tell(sar['player_num'], "^3%s put in group User" % victim.get_name())
-                            victim.update_db_admin_role(role=1)
-                        else:
-                            self.game.rcon_tell(sar['player_num'], "^3Sorry, you cannot put %s in group User" % victim.get_name())
-                else:
-                    self.game.rcon_tell(sar['player_num'], "^7Usage: !ungroup <name>")
+    def set_role(self, guid, role):
+        """
+        update the cached role after the admins table has been written
 
-## iamgod
-            # iamgod - register user as Head Admin
-            elif sar['command'] == '!iamgod':
-                if self.iamgod:
-                    if not self.game.players[sar['player_num']].get_registered_user():
-                        # register new user in DB and set admin role to 100
-                        self.game.players[sar['player_num']].register_user_db(role=100)
-                    else:
-                        self.game.players[sar['player_num']].update_db_admin_role(role=100)
-                    self.iamgod = False
-                    self.game.rcon_tell(sar['player_num'], "^7You are registered as ^6Head Admin")
+        @param guid: The GUID of the player
+        @type  guid: String
+        @param role: The admin role
+        @type  role: Integer
+        """
+        with self.lock:
+            self.store(guid, role)
+            if role == 100:
+                self.head_admin = True
 
-## unknown command
-            elif sar['command'].startswith('!') and len(sar['command']) > 1 and self.game.players[sar['player_num']].get_admin_role() >= 40:
-                if sar['command'].lstrip('!') in self.headadmin_cmds:
-                    self.game.rcon_tell(sar['player_num'], "^7Insufficient privileges to use command ^3%s" % sar['command'])
+    def has_head_admin(self):
+        """
+        return True if a Head Admin is registered
+        """
+        return self.head_admin
 
 
 ### CLASS Player ###
@@ -660,8 +2742,11 @@ class Player(object):
     """
     Player class
     """
+    __slots__ = ('player_num', 'guid', 'name', 'prettyname', 'registered_user', 'admin_role', 'address', 'team')
+
     teams = {0: "green", 1: "red", 2: "blue", 3: "spectator"}
     roles = {0: "Guest", 1: "User", 40: "Admin", 100: "Head Admin"}
+    color_reo = re.compile(r'\^[0-9]')
 
     def __init__(self, player_num, ip_address, guid, name):
         """
@@ -669,24 +2754,24 @@ class Player(object):
         """
         self.player_num = player_num
         self.guid = guid
-        self.name = name.replace(' ', '')
+        self.set_name(name)
         self.registered_user = False
         self.admin_role = 0
         self.address = ip_address
         self.team = 3
 
-        self.prettyname = self.name
-        # remove color characters from name
-        for item in xrange(10):
-            self.prettyname = self.prettyname.replace('^%d' % item, '')
+    @staticmethod
+    def strip_colors(name):
+        """
+        remove color characters from name
+        """
+        return Player.color_reo.sub('', name) if '^' in name else name
 
     def check_database(self):
         # check admins table
-        values = (self.guid,)
-        curs.execute("SELECT `admin_role` FROM `admins` WHERE `guid` = ?", values)
-        result = curs.fetchone()
-        if result:
-            self.admin_role = result[0]
+        role = admin_cache.get_role(self.guid)
+        if role is not None:
+            self.admin_role = role
             self.registered_user = True
         else:
             self.registered_user = False
@@ -694,19 +2779,22 @@ class Player(object):
     def register_user_db(self, role=1):
         if not self.registered_user:
             values = (self.guid, self.prettyname, self.address, role)
-            curs.execute("INSERT INTO `admins` (`guid`,`name`,`ip_address`,`admin_role`) VALUES (?,?,?,?)", values)
-            conn.commit()
+            db_writer.execute("INSERT OR REPLACE INTO `admins` (`guid`,`name`,`ip_address`,`admin_role`) VALUES (?,?,?,?)", values)
+            # the cache and the player serve the new role until the write has been committed
+            admin_cache.set_role(self.guid, role)
+            self.registered_user = True
             self.admin_role = role
 
     def update_db_admin_role(self, role):
         values = (role, self.guid)
-        curs.execute("UPDATE `admins` SET `admin_role` = ? WHERE `guid` = ?", values)
-        conn.commit()
+        db_writer.execute("UPDATE `admins` SET `admin_role` = ? WHERE `guid` = ?", values)
+        admin_cache.set_role(self.guid, role)
         # overwrite admin role in game, no reconnect of player required
         self.set_admin_role(role)
 
     def set_name(self, name):
         self.name = name.replace(' ', '')
+        self.prettyname = self.strip_colors(self.name)
 
     def get_name(self):
         return self.name
@@ -730,31 +2818,133 @@ class Player(object):
         return self.admin_role
 
 
+### CLASS Message Formatter ###
+class MessageFormatter(object):
+    """
+    wrap chat messages at a visible width, Quake color codes take no space and are never split
+    """
+    def __init__(self, width=128, cache_size=512):
+        """
+        create a new instance of MessageFormatter
+
+        @param width: The maximum number of visible characters per line
+        @type  width: Integer
+        @param cache_size: The maximum number of cached messages
+        @type  cache_size: Integer
+        """
+        self.width = width
+        self.cache_size = cache_size
+        # message -> wrapped lines, usage texts and the !help and !list output are sent over and over
+        self.cache = {}
+        self.hits = 0
+
+    @staticmethod
+    def visible_length(text):
+        """
+        return the number of visible characters of a text
+        """
+        return len(Player.color_reo.sub('', text)) if '^' in text else len(text)
+
+    @staticmethod
+    def split_word(word, length):
+        """
+        split a word after the given number of visible characters, keeping color codes intact
+        """
+        pos = 0
+        visible = 0
+        while pos < len(word) and visible < length:
+            if word[pos] == '^' and word[pos + 1:pos + 2].isdigit():
+                pos += 2
+                continue
+            pos += 1
+            visible += 1
+        return word[:pos], word[pos:]
+
+    def wrap(self, msg):
+        """
+        return the lines of the message, each line continues in the last color of the previous one
+
+        @param msg: The message
+        @type  msg: String
+        """
+        lines = self.cache.get(msg)
+        if lines is not None:
+            self.hits += 1
+            return lines
+        lines = []
+        words = []
+        used = 0
+        for word in msg.split():
+            length = self.visible_length(word)
+            if words and used + 1 + length > self.width:
+                lines.append(' '.join(words))
+                words = []
+                used = 0
+            while length > self.width:
+                head, word = self.split_word(word, self.width)
+                lines.append(head)
+                length -= self.width
+            used += length + 1 if words else length
+            words.append(word)
+        if words:
+            lines.append(' '.join(words))
+        for num in xrange(1, len(lines)):
+            colors = Player.color_reo.findall(lines[num - 1])
+            if colors and not lines[num].startswith(colors[-1]):
+                lines[num] = colors[-1] + lines[num]
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[msg] = lines
+        return lines
+
+
 ### CLASS Game ###
 class Game(object):
     """
     Game class
     """
-    def __init__(self, config_file):
+    def __init__(self, config_file, loop=None, section='server'):
         """
         create a new instance of Game
 
         @param config_file: The full path of the bot configuration file
         @type  config_file: String
-        """
-        self.all_maps_list = []
+        @param loop: The event loop for the RCON traffic and timers, None to use threads
+        @type  loop: Instance
+        @param section: The configuration section of the game server
+        @type  section: String
+        """
+        self.loop = loop
+        self.map_catalog = MapCatalog()
+        self.maps_lock = RLock()
+        self.maps_refreshing = False
+        self.maps_updated = 0
+        self.maps_checked = 0
         self.players = {}
+        # player indexes: normalized name -> player numbers, player number -> normalized name
+        self.player_names = {}
+        self.player_keys = {}
+        # substring index over the normalized names, rebuilt on demand for partial matches
+        self.name_index = None
+        # the !list message, rendered again after players joined, left or have been renamed
+        self.player_list = None
+        self.formatter = MessageFormatter(128)
         self.live = False
         game_cfg = ConfigParser.ConfigParser()
         game_cfg.read(config_file)
-        self.rcon_handle = Rcon(game_cfg.get('server', 'server_ip'), game_cfg.get('server', 'server_port'), game_cfg.get('server', 'rcon_password'))
+        rcon_rate = game_cfg.getfloat('bot', 'rcon_rate') if game_cfg.has_option('bot', 'rcon_rate') else 10
+        rcon_burst = game_cfg.getint('bot', 'rcon_burst') if game_cfg.has_option('bot', 'rcon_burst') else 10
+        merge_tell = game_cfg.getint('bot', 'rcon_merge_tell') if game_cfg.has_option('bot', 'rcon_merge_tell') else 0
+        # the server address identifies the server in the shared database
+        self.server = "%s:%s" % (game_cfg.get(section, 'server_ip'), game_cfg.get(section, 'server_port'))
+        self.rcon_handle = Rcon(game_cfg.get(section, 'server_ip'), game_cfg.get(section, 'server_port'), game_cfg.get(section, 'rcon_password'), rcon_rate, rcon_burst, merge_tell, loop)
+        # refresh interval of the map list in seconds, 0 = refresh on map change only
+        self.map_refresh = game_cfg.getint('bot', 'map_refresh') if game_cfg.has_option('bot', 'map_refresh') else 3600
 
         # add pcwbot as player 'World' to the game
         world = Player(1022, '127.0.0.1', 'NONE', 'World')
         self.add_player(world)
-        print "- Added pcwbot successful to the game.\n"
-        print "pcwbot is running until you are closing this session or pressing CTRL + C to abort this process."
-        print "*** Note: Use the provided initscript to run pcwbot as daemon ***\n"
+        print "- Added pcwbot successful to the game %s." % self.server
 
     def send_rcon(self, command):
         """
@@ -775,8 +2965,7 @@ class Game(object):
         @param msg: The message to display in private chat
         @type  msg: String
         """
-        lines = textwrap.wrap(msg, 128)
-        for line in lines:
+        for line in self.formatter.wrap(msg):
             self.send_rcon('tell %d %s' % (player_num, line))
 
     def rcon_forceteam(self, player_num, team):
@@ -805,27 +2994,92 @@ class Game(object):
         """
         self.live = True
         self.rcon_handle.go_live()
-        self.set_all_maps()
+        self.load_maps()
+        if not self.map_catalog or time.time() - self.maps_updated >= self.map_refresh:
+            self.refresh_maps()
+        if self.map_refresh > 0:
+            if self.loop:
+                self.loop.call_later(self.map_refresh, self.map_timer_event)
+            else:
+                timer = Thread(target=self.map_timer, name='map timer %s' % self.server)
+                timer.setDaemon(True)
+                timer.start()
 
-    def set_all_maps(self):
+    def load_maps(self):
+        """
+        load the map list of the last run from the database
+        """
+        start = time.time()
+        curs.execute("SELECT `name`, `updated` FROM `maps` WHERE `server` = ?", (self.server,))
+        result = curs.fetchall()
+        metrics.observe('pcwbot_sqlite_seconds', time.time() - start, (('query', 'load_maps'),))
+        if result:
+            self.map_catalog = MapCatalog([row[0] for row in result])
+            self.maps_updated = max([row[1] for row in result])
+
+    def refresh_maps(self):
+        """
+        refresh the map list in the background unless a refresh is already running
+        """
+        with self.maps_lock:
+            if self.maps_refreshing:
+                return
+            self.maps_refreshing = True
+        refresher = Thread(target=self.set_all_maps, name='map refresh %s' % self.server)
+        refresher.setDaemon(True)
+        refresher.start()
+
+    def check_map_refresh(self):
         """
-        set a list of all available maps
+        refresh the map list if the interval is over, return the seconds until the next check
         """
-        all_maps = self.rcon_handle.get_rcon_output("dir map bsp")[1].split()
-        all_maps_list = [maps.replace("/", "").replace(".bsp", "") for maps in all_maps if maps.startswith("/")]
-        pk3_list = self.rcon_handle.get_rcon_output("fdir *.pk3")[1].split()
-        all_pk3_list = [maps.replace("/", "").replace(".pk3", "").replace(".bsp", "") for maps in pk3_list if maps.startswith("/ut4_")]
+        remaining = self.maps_checked + self.map_refresh - time.time()
+        if remaining <= 0:
+            self.refresh_maps()
+            remaining = self.map_refresh
+        return max(remaining, 1)
 
-        all_together = list(set(all_maps_list + all_pk3_list))
-        all_together.sort()
-        if all_together:
-            self.all_maps_list = all_together
+    def map_timer(self):
+        """
+        Thread process, refresh the map list periodically
+        """
+        while 1:
+            time.sleep(self.check_map_refresh())
+
+    def map_timer_event(self):
+        """
+        refresh the map list periodically on the event loop
+        """
+        self.loop.call_later(self.check_map_refresh(), self.map_timer_event)
+
+    def set_all_maps(self):
+        """
+        set a list of all available maps and store it in the database
+        """
+        self.maps_checked = time.time()
+        try:
+            all_maps = self.rcon_handle.get_rcon_output("dir map bsp", multipacket=True)[1].split()
+            all_maps_list = [maps.replace("/", "").replace(".bsp", "") for maps in all_maps if maps.startswith("/")]
+            pk3_list = self.rcon_handle.get_rcon_output("fdir *.pk3", multipacket=True)[1].split()
+            all_pk3_list = [maps.replace("/", "").replace(".pk3", "").replace(".bsp", "") for maps in pk3_list if maps.startswith("/ut4_")]
+
+            all_together = set(all_maps_list + all_pk3_list)
+            if all_together:
+                self.map_catalog = MapCatalog(all_together)
+                self.maps_updated = int(time.time())
+                db_writer.execute("DELETE FROM `maps` WHERE `server` = ?", (self.server,))
+                db_writer.executemany("INSERT INTO `maps` (`server`,`name`,`updated`) VALUES (?,?,?)", [(self.server, name, self.maps_updated) for name in all_together])
+        except Exception, err:
+            print "- Refreshing the map list failed: %s" % err
+        finally:
+            with self.maps_lock:
+                self.maps_refreshing = False
 
     def get_all_maps(self):
         """
         get a list of all available maps
         """
-        return self.all_maps_list
+        return self.map_catalog.get_maps()
 
     def add_player(self, player):
         """
@@ -834,24 +3088,214 @@ class Game(object):
         @param player: The instance of the player
         @type  player: Instance
         """
-        self.players[player.get_player_num()] = player
+        player_num = player.get_player_num()
+        self.unindex_player(player_num)
+        self.players[player_num] = player
+        self.player_list = None
+        if player_num != 1022:
+            self.index_player(player)
         player.check_database()
 
+    def remove_player(self, player_num):
+        """
+        remove a player from the game
 
-### Main ###
-print "\n\nStarting pcwbot %s:" % __version__
+        @param player_num: The player number
+        @type  player_num: Integer
+        """
+        self.unindex_player(player_num)
+        del self.players[player_num]
+        self.player_list = None
+
+    def rename_player(self, player_num, name):
+        """
+        change the name of a player
+
+        @param player_num: The player number
+        @type  player_num: Integer
+        @param name: The new name of the player
+        @type  name: String
+        """
+        player = self.players[player_num]
+        self.unindex_player(player_num)
+        player.set_name(name)
+        self.player_list = None
+        if player_num != 1022:
+            self.index_player(player)
+
+    def get_player_list(self):
+        """
+        return the !list message of the connected players
+        """
+        if self.player_list is None:
+            self.player_list = "^7Current players: %s" % ", ".join(["^3%s [^2%d^3]" % (ply.get_name(), ply.get_player_num()) for ply in self.players.itervalues() if ply.get_player_num() != 1022])
+        return self.player_list
+
+    def index_player(self, player):
+        """
+        add the color-stripped, lowercase name of a player to the name index
+        """
+        key = player.prettyname.lower()
+        self.player_keys[player.get_player_num()] = key
+        if key in self.player_names:
+            self.player_names[key].append(player.get_player_num())
+        else:
+            self.player_names[key] = [player.get_player_num()]
+            self.name_index = None
+
+    def unindex_player(self, player_num):
+        """
+        remove a player from the name index
+        """
+        key = self.player_keys.pop(player_num, None)
+        if key is not None:
+            nums = self.player_names[key]
+            nums.remove(player_num)
+            if not nums:
+                del self.player_names[key]
+                self.name_index = None
+
+    def find_players(self, user):
+        """
+        return a list of players matching the given player number or name, an exact match is returned alone
 
-# connect to database
-conn = sqlite3.connect('./data.sqlite')
-curs = conn.cursor()
+        @param user: The player number or (partial) name
+        @type  user: String
+        """
+        if user.isdigit() and str(int(user)) == user and int(user) in self.player_keys:
+            return [self.players[int(user)]]
+        key = Player.strip_colors(user).lower()
+        if key in self.player_names:
+            return [self.players[self.player_names[key][0]]]
+        if self.name_index is None:
+            self.name_index = SubstringIndex(self.player_names)
+        return [self.players[num] for name in self.name_index.contains(key) for num in self.player_names[name]]
 
-# create tables if not exists
-curs.execute('CREATE TABLE IF NOT EXISTS admins (id INTEGER PRIMARY KEY NOT NULL, guid TEXT NOT NULL, name TEXT NOT NULL, ip_address TEXT NOT NULL, admin_role INTEGER DEFAULT 1)')
 
-print "- Connected to database 'data.sqlite' successful."
+### Offline Replay ###
+def replay_log(config_file, section, path):
+    """
+    replay a games log file with all handlers and a NullRcon, print lines/sec and the handler counts
+
+    @param config_file: The full path of the bot configuration file
+    @type  config_file: String
+    @param section: The configuration section of the game server the log belongs to
+    @type  section: String
+    @param path: The full path of the games log file
+    @type  path: String
+    """
+    parser = LogParser(config_file, section, path)
+    parser.game = Game(config_file, section=section)
+    parser.game.rcon_handle = NullRcon()
+    parser.game.load_maps()
+    # handlers send their RCON commands to the NullRcon
+    parser.game.live = True
+    parser.game.rcon_handle.go_live()
+
+    start = time.time()
+    lines, counts = parser.replay(path)
+    elapsed = time.time() - start
+    print "\nReplayed %d lines of '%s' in %.3f seconds, %d lines/sec" % (lines, path, elapsed, lines / elapsed if elapsed else 0)
+    for action, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print "  %-16s %8d" % (action, count)
+    print "RCON commands: %d" % sum(parser.game.rcon_handle.commands.values())
+    for cmd, count in sorted(parser.game.rcon_handle.commands.items(), key=lambda item: -item[1]):
+        print "  %-16s %8d" % (cmd, count)
 
-# create instance of LogParser
-LogParser('./settings.conf')
 
-# close database connection
-conn.close()
+### Main ###
+if __name__ == '__main__':
+    print "\n\nStarting pcwbot %s:" % __version__
+
+    settings = ConfigParser.ConfigParser()
+    settings.read('./settings.conf')
+
+    # game server sections: [server] and [server:<name>]
+    server_sections = [section for section in settings.sections() if section == 'server' or section.startswith('server:')]
+    if not server_sections:
+        print "- Configuration error: settings.conf has no [server] or [server:<name>] section."
+        sys.exit(1)
+
+    # offline replay: pcwbot.py --replay <games.log> [<server section>]
+    replay_file = sys.argv[2] if len(sys.argv) > 2 and sys.argv[1] == '--replay' else None
+    database = DATABASE
+    if replay_file:
+        # work on a copy, the commands of the replayed log must not change the database of the bot
+        handle, database = tempfile.mkstemp(prefix='pcwbot-replay-', suffix='.sqlite')
+        os.close(handle)
+        for suffix in ('', '-wal'):
+            if os.path.exists(DATABASE + suffix):
+                shutil.copyfile(DATABASE + suffix, database + suffix)
+
+    # connect to database
+    conn = sqlite3.connect(database)
+    curs = conn.cursor()
+    # readers do not block the writer thread and vice versa
+    curs.execute('PRAGMA journal_mode = WAL')
+    # the pragma returns the new mode, an unfinished statement would lock the tables for the migrations
+    curs.fetchone()
+
+    # create or upgrade tables
+    for version, description in migrate_database(conn):
+        print "- Upgraded database schema to version %d: %s" % (version, description)
+
+    print "- Connected to database 'data.sqlite' successful."
+
+    # all writes go through the writer thread, this connection is used for reads only
+    db_writer = DatabaseWriter(database, settings.getint('bot', 'db_batch_size') if settings.has_option('bot', 'db_batch_size') else 100)
+
+    # admin roles shared by all game servers
+    admin_cache = AdminCache(database, settings.getint('bot', 'admin_cache_size') if settings.has_option('bot', 'admin_cache_size') else 10000)
+
+    if replay_file:
+        replay_log('./settings.conf', sys.argv[3] if len(sys.argv) > 3 else 'server', replay_file)
+        db_writer.flush()
+        conn.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+        sys.exit()
+
+    # slow log lines and RCON commands
+    slow_threshold = settings.getfloat('bot', 'slow_threshold') if settings.has_option('bot', 'slow_threshold') else 0
+    if slow_threshold > 0:
+        slow_log.open(settings.get('bot', 'slow_log') if settings.has_option('bot', 'slow_log') else './slow.log', slow_threshold)
+
+    # sampling profiler, started by the configuration or toggled with SIGUSR1
+    profiler = SamplingProfiler(settings.get('bot', 'profile_file') if settings.has_option('bot', 'profile_file') else './pcwbot.folded',
+                                settings.getfloat('bot', 'profile_interval') if settings.has_option('bot', 'profile_interval') else .01)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
+    if settings.has_option('bot', 'profile') and settings.getboolean('bot', 'profile'):
+        profiler.start()
+
+    # Prometheus metrics endpoint
+    metrics_port = settings.getint('bot', 'metrics_port') if settings.has_option('bot', 'metrics_port') else 0
+    if metrics_port:
+        metrics_address = settings.get('bot', 'metrics_address') if settings.has_option('bot', 'metrics_address') else '127.0.0.1'
+        start_metrics_server(metrics_address, metrics_port)
+        print "- Serving metrics on http://%s:%d/metrics" % (metrics_address, metrics_port)
+
+    # one LogParser for each game server section
+    parsers = [LogParser('./settings.conf', section) for section in server_sections]
+
+    print "\npcwbot is running until you are closing this session or pressing CTRL + C to abort this process."
+    print "*** Note: Use the provided initscript to run pcwbot as daemon ***\n"
+
+    # the initscript stops the bot with SIGTERM, leave through the cleanup below like on CTRL + C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        # start parsing the games logfiles, several servers share one event loop
+        if len(parsers) > 1 or parsers[0].use_event_loop:
+            event_loop = EventLoop()
+            for parser in parsers:
+                parser.start(event_loop)
+            event_loop.run_forever()
+        else:
+            parsers[0].read_log()
+    finally:
+        profiler.stop()
+        # commit the queued writes and close the database connection
+        db_writer.flush()
+        conn.close()